@@ -0,0 +1,121 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import gzip
+import json
+from collections import Counter
+from typing import List, Dict, Tuple, Any
+
+from core import record_pairs, remap_pairs
+from vocabulary import Vocabulary
+
+STATE_FORMAT_VERSION = 1
+
+# Options that change keywords or records, snapshots built with different values can't be merged
+INCOMPATIBLE_OPTIONS = ("homogenize", "lemmatize", "lemmatization_language", "delimeter", "exclude_keywords", "thesaurus")
+
+def state_options(homogenize: bool, lemmatize: bool, lemmatization_language: str,
+                  delimeter: str, exclude_keywords: List[str], thesaurus:str=None) -> Dict[str, Any]:
+    '''Returns options stored in a snapshot, normalized so that equal settings compare equal.'''
+    return {
+        "homogenize": bool(homogenize),
+        "lemmatize": bool(lemmatize),
+        "lemmatization_language": lemmatization_language.lower() if lemmatize else None,
+        "delimeter": delimeter,
+        "exclude_keywords": sorted(set(exclude_keywords or [])),
+        # Digest of the thesaurus (see normalization.thesaurus_digest), None without one
+        "thesaurus": thesaurus,
+    }
+
+class AnalysisState:
+    '''Keyword vocabulary, keyword frequencies and sparse pair counts of a corpus,
+    which can be saved to a compact snapshot and extended with new records later.
+
+    Counts are kept for every keyword, --filter is applied when the output is made,
+    so that merging new records gives the same counts as analysing everything at once.'''
+    def __init__(self, options: Dict[str, Any]) -> None:
+        self.options = options
+        self.vocabulary = Vocabulary()
+        # Number of records containing a keyword, keyed by vocabulary ID
+        self.document_counts = Counter()
+        # Co-occurrences keyed by vocabulary IDs (a, b) with a < b
+        self.pairs = Counter()
+        self.num_records = 0
+
+    def check_compatible(self, options: Dict[str, Any]) -> None:
+        '''Raises ValueError if records analysed with options can't be merged into this state.'''
+        differences = [f"{name}: {self.options.get(name)!r} (snapshot) != {options.get(name)!r} (current run)"
+                       for name in INCOMPATIBLE_OPTIONS if self.options.get(name) != options.get(name)]
+        if differences:
+            raise ValueError("Snapshot was built with incompatible settings:\n" + "\n".join(differences))
+
+    def add_graph(self, graph: List[List[int]], vocabulary: Vocabulary) -> None:
+        '''Counts keywords and pairs of a graph of IDs (IDs of the given vocabulary) into this state.'''
+        # Keywords are interned in order of appearance in the graph, so that keywords
+        # dropped from it (excluded records) don't get into the state
+        mapping = dict()
+        counts = self.vocabulary.counts
+        for line in graph:
+            ids = list()
+            for id_ in line:
+                new_id = mapping.get(id_)
+                if new_id == None:
+                    new_id = mapping[id_] = self.vocabulary.intern(vocabulary.keywords[id_])
+                ids.append(new_id)
+            for id_ in ids:
+                counts[id_] += 1
+            unique, pairs = record_pairs(ids)
+            self.document_counts.update(unique)
+            self.pairs.update(pairs)
+        self.num_records += len(graph)
+
+    def merge(self, other: "AnalysisState") -> None:
+        '''Adds counts of another state, built with compatible options, into this one.'''
+        self.check_compatible(other.options)
+        mapping = [self.vocabulary.intern(keyword) for keyword in other.vocabulary.keywords]
+        for id_, count in enumerate(other.vocabulary.counts):
+            self.vocabulary.counts[mapping[id_]] += count
+        for id_, count in other.document_counts.items():
+            self.document_counts[mapping[id_]] += count
+        for (a, b), count in other.pairs.items():
+            a, b = sorted((mapping[a], mapping[b]))
+            self.pairs[(a, b)] += count
+        self.num_records += other.num_records
+
+    def co_occurrences(self, num:int=0, min_count:int=1) -> Tuple[List[str], Counter, List[int]]:
+        '''Returns keywords sorted by frequency (only num most frequent if num isn't 0), counts of pairs
+        co-occurring at least min_count times keyed by indices into that list and number of records containing each keyword.'''
+        order = self.vocabulary.top_ids(num if num != 0 else None)
+        return self.vocabulary.decode(order), remap_pairs(self.pairs, order, min_count), [self.document_counts[id_] for id_ in order]
+
+    def save(self, path: str) -> None:
+        '''Saves state as gzip compressed JSON, pairs are stored as a flat list of (a, b, count) integers.'''
+        flat_pairs = list()
+        for (a, b), count in self.pairs.items():
+            flat_pairs.extend((a, b, count))
+        data = {
+            "format_version": STATE_FORMAT_VERSION,
+            "options": self.options,
+            "num_records": self.num_records,
+            "keywords": self.vocabulary.keywords,
+            "counts": self.vocabulary.counts,
+            "document_counts": [self.document_counts[id_] for id_ in range(len(self.vocabulary))],
+            "pairs": flat_pairs,
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "AnalysisState":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format_version") != STATE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {data.get('format_version')!r}")
+
+        state = cls(data["options"])
+        for keyword, count in zip(data["keywords"], data["counts"]):
+            state.vocabulary.counts[state.vocabulary.intern(keyword)] = count
+        state.document_counts = Counter(dict(enumerate(data["document_counts"])))
+        flat_pairs = data["pairs"]
+        state.pairs = Counter({(flat_pairs[i], flat_pairs[i + 1]): flat_pairs[i + 2] for i in range(0, len(flat_pairs), 3)})
+        state.num_records = data["num_records"]
+        return state
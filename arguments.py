@@ -0,0 +1,79 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import os
+
+from core import CO_OCCURRENCE_ENGINES
+from path_utils import get_execution_folder
+from lemma_cache import DEFAULT_MAX_SIZE
+from network_formats import OUTPUT_FORMATS
+from similarity import SIMILARITY_MEASURES
+from time_slices import TIME_SLICE_SCHEMES
+from download_lemmatizers import models
+
+__version__ = "0.1.1"
+APP_NAME = "Artyk - Research Analyser"
+
+def add_co_occurrence_arguments(parser) -> None:
+    '''Adds arguments of co-occurrence analysis to a GooeyParser (or a parser accepting its arguments, see cli.py).'''
+    parser.add_argument("filepaths", metavar="Path(es) to excel spreadsheet(s).", nargs='+', type=str, widget="MultiFileChooser",
+                        help="Choose path(es) to spreadsheet file.\n(.xlsx, .xls, .csv) or to tabdelimited file (savedrecs.txt)",
+                        gooey_options={
+                            'wildcard':
+                                "XLSX (Excel spreadsheet) (*.xlsx,*.xls,*.csv,*.txt)|*.xlsx;*.xls;*.csv;*.txt|"
+                                "All files (*.*)|*.*",
+                            'default_file': "Pick XLSX or tab delimited file",
+                            'message': "Select XLSX (Excel spreadsheet) file"
+                        }
+                        )
+    parser.add_argument("--sheet_name", metavar="Name of the sheet",help="Select the sheetname. (Leave empty to select the active spreadsheet.)")
+    parser.add_argument("range", metavar="Range",type=str, help="Range of the cells that will be used in frequency analysis.\nExample: E1:E18|A6:A19, use '|' to select two ranges at once\nFor tabdelimited files (savedrecs.txt) field tags can be used too, example: DE|ID")
+    parser.add_argument("--lemmatize", action='store_true', metavar="Lemmatization", widget="CheckBox", help="Groups together different inflected forms of the same word, for example:\n'tree diseases' -> 'tree disease'\n'asians' -> 'asian'")
+    parser.add_argument("--lemmatization_language", metavar="Lemmatization language", help="Choose the language of your document.\n(Lemmatization for this language will be applied).",widget="Dropdown", choices=[model[0].upper()+model[1::] for model in models], default="English")
+    parser.add_argument("--lemmatization_processes", metavar="Lemmatization processes", help="Number of processes used for lemmatization.\nIncrease on large documents to use more CPU cores.", widget="IntegerField", required=False, default=1)
+    parser.add_argument("--no_lemma_cache", action='store_true', metavar="Disable lemma cache", widget="CheckBox", help="Select if you don't want to reuse lemmas saved by previous runs.", default=False)
+    parser.add_argument("--clear_lemma_cache", action='store_true', metavar="Clear lemma cache", widget="CheckBox", help="Select if you want to remove all lemmas saved by previous runs before lemmatizing.", default=False)
+    parser.add_argument("--lemma_cache_size", metavar="Lemma cache size", help="Maximum number of lemmas kept in the cache.\nLeast recently used lemmas are removed first.", widget="IntegerField", required=False, default=DEFAULT_MAX_SIZE)
+    parser.add_argument("save_as", metavar="Save as...", help="Choose the output file name.",widget="FileSaver",
+                        default=os.path.join(get_execution_folder(),"output.xlsx"),
+                        gooey_options={
+                                'wildcard':
+                                    "XLSX (Excel spreadsheet) (*.xlsx)|*.xlsx|"
+                                    "Edge list (*.csv)|*.csv|"
+                                    "GraphML (*.graphml)|*.graphml|"
+                                    "Pajek (*.net)|*.net|"
+                                    "All files (*.*)|*.*",
+                                'message': "Create a name for the xlsx file",
+                            })
+    parser.add_argument("--output_format", metavar="Output format", help="Choose the format of the output file.\nauto - detect from the file extension (.xlsx, .csv, .graphml, .net).\nxlsx - co-occurrence matrix.\nedges - weighted edge list (Source, Target, Weight).\ngraphml, pajek - network files for Gephi, NodeXL, Pajek.", widget="Dropdown", choices=["auto"] + sorted(set(OUTPUT_FORMATS.values())), default="auto")
+    parser.add_argument("--delimeter", metavar="Delimeter for cell's data", default=";", help="Select the delimeter between keys in cell value.\nFor your original document.",)
+    parser.add_argument("--exclude_keywords", type=str, metavar="Exclude specific keywords", help="If you want to remove cells that contain one of specific keywords, write them using semicolons (;) or commas (,)\nExample: Science; Climate change")
+    parser.add_argument("--binary", action='store_true', metavar="Binary matrix", widget="CheckBox", help="Select if you want to make the co-occurrence matrix binary.\n(Only 0s and 1s)", default=False)
+    parser.add_argument("--homogenize", action='store_true', metavar="Convert to lower case", widget="CheckBox", help="Select if you want to convert data in cells to lower cased version.", default=False)
+    parser.add_argument("--thesaurus", metavar="Thesaurus file", help="VOSviewer thesaurus file (tab delimited 'label' and 'replace by' columns)\nto merge keyword variants into one term. Empty 'replace by' removes the keyword.", widget="FileChooser", required=False,
+                        gooey_options={'wildcard': "Thesaurus (*.txt)|*.txt|All files (*.*)|*.*"})
+    parser.add_argument("--filter", metavar="Filterings", help="Reduce number of keywords to the given value, uses keyword frequency to filter.\nSignificantly speeds up calculating process.\nSet to 0 to disable.", widget="IntegerField", required=False, default=0)
+    parser.add_argument("--approximate_filter", action='store_true', metavar="Approximate filtering", widget="CheckBox", help="Select to find the most frequent keywords for filtering in bounded memory (Space-Saving),\nfor files with millions of different keywords. The files are read twice.", default=False)
+    parser.add_argument("--filter_candidates", metavar="Filtering candidates", help="Number of candidate keywords kept by approximate filtering, more candidates are more accurate.\nSet to 0 to keep 50 times the number of keywords to leave.", widget="IntegerField", required=False, default=0)
+    parser.add_argument("--no_recount", action='store_true', metavar="Don't recount candidates", widget="CheckBox", help="Select to keep the keywords with the largest approximate counts\ninstead of counting the candidates exactly (uses less memory).", default=False)
+    parser.add_argument("--frequency", action='store_true', metavar="Frequency Analysis", widget="CheckBox", help="Select if you want to add sheet with frequency analysis.", default=False)
+    parser.add_argument("--min_count", metavar="Minimum co-occurrences", help="Remove links between keywords that co-occur less than the given number of times.", widget="IntegerField", required=False, default=1)
+    parser.add_argument("--top_k", metavar="Strongest links per keyword", help="Keep only the given number of strongest links of every keyword.\nSet to 0 to keep all links.", widget="IntegerField", required=False, default=0)
+    parser.add_argument("--similarity", metavar="Similarity measure", help="Normalize co-occurrences of keywords i and j, n - number of records with a keyword.\ncount - raw co-occurrence counts.\nassociation - association strength, c·N / (n_i·n_j).\njaccard - c / (n_i + n_j - c).\ncosine - c / √(n_i·n_j).\ninclusion - c / min(n_i, n_j).", widget="Dropdown", choices=list(SIMILARITY_MEASURES), default="count")
+    parser.add_argument("--network_analysis", action='store_true', metavar="Network analysis", widget="CheckBox", help="Select if you want to add sheet with links, total link strength, strongest neighbours\nand cluster (Louvain modularity clustering) of every keyword.\nOther output formats save it to <output name>_network.csv.", default=False)
+    parser.add_argument("--top_neighbours", metavar="Strongest neighbours", help="Number of strongest neighbours listed for every keyword in network analysis.", widget="IntegerField", required=False, default=5)
+    parser.add_argument("--resolution", metavar="Clustering resolution", help="Resolution of modularity clustering, higher values give more and smaller clusters.", widget="DecimalField", required=False, default=1.0)
+    parser.add_argument("--year_range", metavar="Year range", help="Range of publication years of the records (same rows as the keywords),\nexample: F2:F59, or PY for savedrecs.txt.\nAdditional co-occurrence matrix is saved for every time slice, e.g. output_2001-2005.xlsx.", required=False)
+    parser.add_argument("--time_slices", metavar="Time slices", help="year - a matrix per publication year.\nwindow - consecutive periods of slice size years.\nsliding - periods of slice size years moved by slice step years.", widget="Dropdown", choices=list(TIME_SLICE_SCHEMES), default="year")
+    parser.add_argument("--slice_size", metavar="Slice size", help="Number of years in a time slice (window and sliding).", widget="IntegerField", required=False, default=5)
+    parser.add_argument("--slice_step", metavar="Slice step", help="Number of years between starts of sliding time slices.\nThe last slice always ends at the last publication year.", widget="IntegerField", required=False, default=1)
+    parser.add_argument("--load_state", metavar="Load analysis state", help="Snapshot saved by a previous run, the given files are added to its counts.\n(Filtering and frequency analysis then use the merged counts.)", widget="FileChooser", required=False,
+                        gooey_options={'wildcard': "Artyk snapshot (*.artyk)|*.artyk|All files (*.*)|*.*"})
+    parser.add_argument("--save_state", metavar="Save analysis state", help="Save keywords, frequencies and co-occurrence counts to a snapshot,\nso that new files can be added to them later without recomputing.", widget="FileSaver", required=False,
+                        gooey_options={'wildcard': "Artyk snapshot (*.artyk)|*.artyk|All files (*.*)|*.*"})
+    parser.add_argument("--corpus", metavar="Corpus file", help="Keep the parsed records in a compact memory-mapped file.\nLater runs on the same files read it instead of the spreadsheets,\nand corpora larger than memory can be analysed.", widget="FileSaver", required=False,
+                        gooey_options={'wildcard': "Artyk corpus (*.artykc)|*.artykc|All files (*.*)|*.*"})
+    parser.add_argument("--workers", metavar="Worker processes", help="Number of processes that read, normalize and count the files in parallel.\nThe result is the same as with a single process.", widget="IntegerField", required=False, default=1)
+    parser.add_argument("--engine", metavar="Counting engine", help="Choose how the co-occurrence matrix is counted.\nsparse - single pass over the records (fast).\nincidence - sparse matrix product, needs numpy and scipy (fastest on large corpora).\ndense - cell by cell reference implementation (slow).", widget="Dropdown", choices=list(CO_OCCURRENCE_ENGINES), default="sparse")
+    parser.add_argument("--no_run_report", action='store_true', metavar="Disable run report", widget="CheckBox", help="Select if you don't want to save time, memory and counters of every stage\nto <output name>_report.json next to the output.", default=False)
+    parser.add_argument("--profile", action='store_true', metavar="Profile (cProfile)", widget="CheckBox", help="Select to profile the run, statistics are saved to <output name>.prof\nand the slowest functions are written to the log.", default=False)
+    parser.add_argument("--trace_memory", action='store_true', metavar="Trace memory (tracemalloc)", widget="CheckBox", help="Select to measure memory allocated by every stage and list the largest allocations in the run report.\n(Slows the run down.)", default=False)
@@ -0,0 +1,171 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Tuple
+
+from arguments import __version__
+from core import filter_by_frequency, homogenize, lemmatize, generate_co_occurrence_matrix, co_occurrences_ids
+from spreadsheet import load_xls_sheet_values, iter_file_records
+from network_formats import write_network
+from vocabulary import encode_graph
+from heavy_hitters import approximate_top
+from synthetic_corpus import generate_corpus, corpus_range, CORPUS_FORMATS
+
+# Setting up logger
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(filename)s:%(lineno)d]: %(message)s')
+logger = logging.getLogger(__name__)
+
+# Number of records of every scale, vocabulary size grows with the number of records
+SCALES = {
+    "small": 1000,
+    "medium": 10000,
+    "large": 100000,
+}
+
+# Dense engine is the cell by cell reference implementation, it is only run on small corpora
+# filtered down to this number of keywords
+DENSE_MAX_RECORDS = 1000
+DENSE_MAX_KEYWORDS = 100
+
+def measure(func: Callable[[], Any], repeat:int=1, memory:bool=True) -> Tuple[Any, Dict[str, float]]:
+    '''Runs func repeat times, returns its result, best wall time and CPU time,
+    and (in one more run, as tracing slows the code down) peak memory allocated by Python.'''
+    seconds = cpu_seconds = float("inf")
+    for _ in range(repeat):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        result = func()
+        seconds = min(seconds, time.perf_counter() - started)
+        cpu_seconds = min(cpu_seconds, time.process_time() - cpu_started)
+    metrics = {"seconds": round(seconds, 6), "cpu_seconds": round(cpu_seconds, 6)}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            metrics["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 3)
+        finally:
+            tracemalloc.stop()
+    return result, metrics
+
+def benchmark_scale(scale: str, num_records: int, folder: str, formats: List[str], keywords_per_record:int=5,
+                    filter_num:int=1000, repeat:int=1, memory:bool=True, lemmatization_language:str=None) -> List[Dict[str, Any]]:
+    '''Generates a corpus of num_records records and times every stage of the analysis on it.'''
+    results = list()
+
+    def run(stage: str, func: Callable[[], Any], **details) -> Any:
+        logger.info(f"[{scale}] {stage}")
+        result, metrics = measure(func, repeat, memory)
+        results.append({"scale": scale, "records": num_records, "stage": stage, **details, **metrics})
+        return result
+
+    paths = generate_corpus(folder, scale, num_records, formats, keywords_per_record=keywords_per_record,
+                            vocabulary_size=num_records)
+
+    graph = None
+    for corpus_format, path in paths.items():
+        range_ = corpus_range(corpus_format, num_records)
+        if corpus_format == "savedrecs":
+            loaded = run("load", lambda: list(iter_file_records(path, range_)), format=corpus_format)
+        else:
+            loaded = run("load", lambda: load_xls_sheet_values(path, range_), format=corpus_format)
+        graph = graph or loaded
+
+    vocabulary, id_graph = run("intern", lambda: encode_graph(graph))
+    results[-1]["keywords"] = len(vocabulary)
+    run("filter_by_frequency", lambda: filter_by_frequency(graph, filter_num), filter=filter_num)
+    run("approximate_top", lambda: approximate_top(graph, filter_num), filter=filter_num)
+    homogenized = run("homogenize", lambda: homogenize(graph))
+    if lemmatization_language != None:
+        run("lemmatize", lambda: lemmatize(homogenized, language=lemmatization_language), language=lemmatization_language)
+
+    filtered = filter_by_frequency(graph, filter_num)
+    filtered_vocabulary, filtered_id_graph = encode_graph(filtered)
+    for engine in ("sparse", "incidence", "dense"):
+        engine_filter = filter_num
+        if engine == "dense":
+            if num_records > DENSE_MAX_RECORDS:
+                continue
+            engine_filter = min(filter_num, DENSE_MAX_KEYWORDS)
+        engine_graph = filtered if engine_filter == filter_num else filter_by_frequency(graph, engine_filter)
+        run("generate_co_occurrence_matrix", lambda: generate_co_occurrence_matrix(engine_graph, engine=engine),
+            engine=engine, filter=engine_filter)
+
+    for engine in ("sparse", "incidence"):
+        keywords, pairs = run("count_co_occurrences", lambda: co_occurrences_ids(id_graph, vocabulary, engine=engine), engine=engine)
+    results[-1]["pairs"] = len(pairs)
+
+    for output_format in ("edges", "graphml", "xlsx"):
+        extension = {"edges": "csv", "graphml": "graphml", "xlsx": "xlsx"}[output_format]
+        output_filename = os.path.join(folder, f"{scale}_output.{extension}")
+        # Matrix is limited by the number of Excel columns, so it is written for the filtered graph
+        if output_format == "xlsx":
+            output_keywords, output_pairs = co_occurrences_ids(filtered_id_graph, filtered_vocabulary)
+        else:
+            output_keywords, output_pairs = keywords, pairs
+        run("write", lambda: write_network(output_keywords, output_pairs, output_filename, output_format=output_format),
+            format=output_format)
+    return results
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    '''Returns lines comparing wall time of every stage with a baseline results file.'''
+    def key(result: Dict[str, Any]) -> Tuple:
+        return tuple((name, result[name]) for name in ("scale", "stage", "format", "engine", "filter") if name in result)
+
+    baseline_seconds = {key(result): result["seconds"] for result in baseline["results"]}
+    lines = list()
+    for result in results["results"]:
+        before = baseline_seconds.get(key(result))
+        if before == None or result["seconds"] == 0:
+            continue
+        name = " ".join(str(value) for _, value in key(result))
+        lines.append(f"{name:<55} {before:>10.4f}s -> {result['seconds']:>10.4f}s  x{before / result['seconds']:.2f}")
+    return lines
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Times every stage of the analysis on synthetic corpora.")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"])
+    parser.add_argument("--formats", nargs="+", choices=CORPUS_FORMATS, default=list(CORPUS_FORMATS))
+    parser.add_argument("--keywords_per_record", type=int, default=5)
+    parser.add_argument("--filter", type=int, default=1000, help="Number of keywords left by filter_by_frequency.")
+    parser.add_argument("--repeat", type=int, default=1, help="Best time of the given number of runs is reported,\n"
+                                                                 "more than 1 leaves out one-off costs such as lazy imports.")
+    parser.add_argument("--no_memory", action="store_true", help="Don't measure peak memory (saves one run of every stage).")
+    parser.add_argument("--lemmatization_language", help="Lemmatize with the given language (the model must be downloaded).")
+    parser.add_argument("--folder", help="Folder for generated corpora and outputs, temporary folder by default.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file with the results.")
+    parser.add_argument("--compare", help="Results file of a previous run to compare with.")
+    args = parser.parse_args(argv)
+
+    results = {
+        "version": __version__,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": {name: value for name, value in vars(args).items() if name not in ("output", "compare", "folder")},
+        "results": list(),
+    }
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        folder = args.folder or temporary_folder
+        for scale in args.scales:
+            results["results"].extend(benchmark_scale(scale, SCALES[scale], folder, args.formats, args.keywords_per_record,
+                                                      args.filter, args.repeat, not args.no_memory, args.lemmatization_language))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    logger.info(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print("\n".join(compare(results, json.load(f))))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
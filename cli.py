@@ -0,0 +1,58 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import sys
+import logging
+import argparse
+import multiprocessing
+
+from arguments import add_co_occurrence_arguments, APP_NAME, __version__
+from pipeline import AnalysisOptions, Pipeline, log_settings, run_batch
+
+# Setting up logger
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(filename)s:%(lineno)d]: %(message)s')
+logger = logging.getLogger(__name__)
+
+# Arguments only understood by GooeyParser
+_GOOEY_KEYWORDS = ("widget", "gooey_options")
+
+class HeadlessParser(argparse.ArgumentParser):
+    '''ArgumentParser accepting GooeyParser arguments, so that the GUI and the command line
+    share one definition of the arguments (arguments.py) without importing wx.'''
+    def add_argument(self, *args, **kwargs):
+        for keyword in _GOOEY_KEYWORDS:
+            kwargs.pop(keyword, None)
+        # Gooey uses metavar as a label, on the command line it would replace the argument name
+        kwargs.pop("metavar", None)
+        return super().add_argument(*args, **kwargs)
+
+def build_parser() -> HeadlessParser:
+    parser = HeadlessParser(prog="cli.py", description=f"{APP_NAME} {__version__} (command line, without GUI)")
+    subs = parser.add_subparsers(help='commands', dest='command', required=True)
+
+    co_occurrence_parser = subs.add_parser('co-occurrence-analysis', help="Generate co-occurrence matrix or network of keywords.")
+    add_co_occurrence_arguments(co_occurrence_parser)
+
+    batch_parser = subs.add_parser('batch', help="Run every analysis of a JSON job file, files are read once for all jobs.")
+    batch_parser.add_argument("job_file", help="JSON file: {\"defaults\": {...}, \"jobs\": [{...}, ...]},\n"
+                                               "options are named as co-occurrence-analysis arguments.")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.command == "co-occurrence-analysis":
+        logger.info("Starting algorithm.")
+        options = AnalysisOptions.from_args(args)
+        log_settings(options, header=f"{APP_NAME} {__version__}")
+        Pipeline().run(options)
+        logger.info("Success! The program has finished.")
+        return 0
+
+    if args.command == "batch":
+        failed = run_batch(args.job_file)
+        return 1 if failed else 0
+
+if __name__ == "__main__":
+    # Required by multiprocessing (workers, lemmatization processes)
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -4,11 +4,22 @@ import os
 
 from main import APP_NAME
 
+HIDDEN_IMPORTS = [
+    "pyexcel",
+    "pyexcel_xls",
+    "pyexcel_xlsx",
+    "pyexcel_xlsxw",
+    "pyexcel_io",
+    "pyexcel_io.writers",
+]
+
 commands = [
     "pyinstaller",
     "--onefile",
     '--add-data "icons;icons"',
     '--add-data "models;models"',
+    # pyexcel and its plugins are imported lazily, so pyinstaller can't find them by itself
+    *[f'--hidden-import "{module}"' for module in HIDDEN_IMPORTS],
     f'--icon="{os.path.join("icons", "program_icon.ico")}"',
     f'--name "{APP_NAME}"',
     '--noconsole "main.py"'
@@ -0,0 +1,49 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+'''Fixtures shared by the tests, run them with: python -m pytest -q'''
+
+import os
+
+import pytest
+
+from pipeline import Pipeline, AnalysisOptions
+from synthetic_corpus import generate_records, write_csv, write_savedrecs
+
+@pytest.fixture(scope="session")
+def records():
+    # Small vocabulary, so that records often repeat keywords
+    return generate_records(600, keywords_per_record=6, vocabulary_size=60, seed=1)
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory, records):
+    '''The records as savedrecs.txt and .csv, and split into two savedrecs.txt files ("parts").'''
+    folder = tmp_path_factory.mktemp("corpus")
+    paths = {"savedrecs": str(folder / "corpus.txt"), "csv": str(folder / "corpus.csv"),
+             "parts": [str(folder / "part1.txt"), str(folder / "part2.txt")]}
+    write_savedrecs(records, paths["savedrecs"])
+    write_csv(records, paths["csv"])
+    half = len(records) // 2
+    write_savedrecs(records[:half], paths["parts"][0])
+    write_savedrecs(records[half:], paths["parts"][1])
+    return paths
+
+def read_outputs(save_as: str) -> dict:
+    '''Returns contents of the output (a .csv edge list) and the files written next to it.'''
+    name = os.path.splitext(os.path.basename(save_as))[0]
+    folder = os.path.dirname(save_as)
+    outputs = dict()
+    for filename in sorted(os.listdir(folder)):
+        if filename.startswith(name) and filename.endswith(".csv"):
+            with open(os.path.join(folder, filename), encoding="utf-8") as f:
+                outputs[filename] = f.read()
+    return outputs
+
+@pytest.fixture
+def run_analysis():
+    '''Returns a function running an analysis and returning its outputs, see read_outputs.'''
+    def run(filepaths, ranges: str, save_as: str, pipeline: Pipeline=None, **kwargs) -> dict:
+        os.makedirs(os.path.dirname(save_as), exist_ok=True)
+        options = AnalysisOptions(filepaths=filepaths, range=ranges, save_as=save_as, no_run_report=True, **kwargs)
+        pipeline = pipeline or Pipeline(lemma_cache_path=os.path.join(os.path.dirname(save_as), "lemma_cache.sqlite3"))
+        pipeline.run(options)
+        return read_outputs(save_as)
+    return run
@@ -2,45 +2,159 @@
 
 import os
 from collections import Counter
-from typing import List
-
-import spacy
+from functools import lru_cache
+from itertools import combinations
+from typing import List, Dict, Tuple, Union, Iterable, Iterator
 
 from path_utils import resource_path
+from lemma_cache import LemmaCache, read_model_version
+from vocabulary import Vocabulary, encode_graph, remap_graph
 from download_lemmatizers import models
 
 def filter_by_frequency(graph: List[List[str]], num: int) -> List[List[str]]:
     '''Keep only num keywords in a graph, sorted by a frequency.'''
     if num == 0:
         return
-    all_keywords = list()
+    vocabulary, id_graph = encode_graph(graph)
+    return vocabulary.decode_graph(filter_ids_by_frequency(id_graph, vocabulary, num))
+
+def filter_ids_by_frequency(graph: List[List[int]], vocabulary: Vocabulary, num: int, kept: List[int]=None) -> List[List[int]]:
+    '''Keep only num most frequent keywords in a graph of IDs, vocabulary's counts must be counted on this graph.'''
+    return list(iter_filtered_ids(graph, set(vocabulary.top_ids(num)), kept))
+
+def iter_filtered_ids(graph: Iterable[List[int]], keep: set, kept: List[int]=None) -> Iterator[List[int]]:
+    '''Lazily yields records of a graph of IDs with only the IDs in keep, records left empty are skipped.
+    If kept is given, indices of the yielded records are appended to it.'''
+    for index, line in enumerate(graph):
+        ids = [id_ for id_ in line if id_ in keep]
+        if len(ids) >= 1:
+            if kept != None:
+                kept.append(index)
+            yield ids
+
+CO_OCCURRENCE_ENGINES = ("sparse", "incidence", "dense")
+
+def sort_ids_by_frequency(graph: List[List[int]]) -> List[int]:
+    '''Returns unique IDs of a graph sorted by a frequency (ties keep the order of first appearance).'''
+    c = Counter(id_ for line in graph for id_ in line)
+    return [id_ for id_, frequency in c.most_common()]
+
+# Sparse co-occurrences keyed by (a, b) with a < b, counts or similarity weights
+Pairs = Dict[Tuple[int, int], Union[int, float]]
+
+def record_pairs(line: Iterable[int]) -> Tuple[List[int], List[Tuple[int, int]]]:
+    '''Returns sorted unique IDs of a record and its pairs (a, b) with a < b,
+    a keyword repeated inside one record is counted once.'''
+    unique = sorted(set(line))
+    return unique, list(combinations(unique, 2))
+
+def remap_pairs(pairs: Pairs, order: List[int], min_count:int=1) -> Counter:
+    '''Returns pairs of IDs keyed by (row, column) indices into order instead, with row < column.
+    Pairs of IDs missing from order and pairs counted less than min_count times are dropped.'''
+    position = {id_: i for i, id_ in enumerate(order)}
+    remapped = Counter()
+    for (a, b), count in pairs.items():
+        if count >= min_count and a in position and b in position:
+            remapped[tuple(sorted((position[a], position[b])))] = count
+    return remapped
+
+def count_pairs(graph: List[List[int]], min_count:int=1) -> Tuple[List[int], Counter]:
+    '''Count co-occurring keyword pairs in a single pass over a graph of IDs.
+
+    Returns IDs sorted by frequency and a sparse counter of pairs co-occurring at least
+    min_count times, keyed by (row, column) indices into that list with row < column.'''
+    pairs = Counter()
     for line in graph:
-        for keyword in line:
-            all_keywords.append(keyword)
-    
-    # Sorting by quantity
-    c = Counter(all_keywords)
-    most_common = c.most_common()
+        pairs.update(record_pairs(line)[1])
+    order = sort_ids_by_frequency(graph)
+    return order, remap_pairs(pairs, order, min_count)
+
+def count_pairs_incidence(graph: List[List[int]], min_count:int=1) -> Tuple[List[int], Counter]:
+    '''Count co-occurring keyword pairs as XᵀX of a sparse document × keyword incidence matrix.
 
-    filtered_arr = list()
+    Returns the same IDs and pair counter as count_pairs,
+    but the counting itself runs inside scipy. Requires numpy and scipy.'''
     try:
-        for i in range(num):
-            filtered_arr.append(most_common[i][0]) # extracting keyword
-    except IndexError:
-        pass
+        import numpy as np
+        from scipy import sparse
+    except ImportError as e:
+        raise ImportError("The \"incidence\" engine requires numpy and scipy, install them with: pip install numpy scipy") from e
 
-    new_graph = list()
+    order = sort_ids_by_frequency(graph)
+    index = {id_: i for i, id_ in enumerate(order)}
+
+    indptr = [0]
+    indices = list()
     for line in graph:
-        keywords = list()
-        for keyword in line:
-            if keyword in filtered_arr:
-                keywords.append(keyword)
-        if len(keywords) >= 1:
-            new_graph.append(keywords)
-    return new_graph
+        indices.extend({index[id_] for id_ in line})
+        indptr.append(len(indices))
 
-def generate_co_occurrence_matrix(graph: List[List[str]], binary:bool=False):
+    incidence = sparse.csr_matrix((np.ones(len(indices), dtype=np.int64), indices, indptr),
+                                  shape=(len(graph), len(order)))
+    co_occurrence = sparse.triu(incidence.T @ incidence, k=1).tocoo()
+    # Pruned inside scipy, so that rare pairs never get into the counter
+    kept = co_occurrence.data >= min_count
+
+    pairs = Counter(dict(zip(zip(co_occurrence.row[kept].tolist(), co_occurrence.col[kept].tolist()),
+                             co_occurrence.data[kept].tolist())))
+    return order, pairs
+
+def build_matrix(keywords: List[str], pairs: Counter, binary:bool=False) -> List[List[Union[str, int, None]]]:
+    '''Build dense, symmetric co-occurrence matrix (with header row and column) from sparse pair counts.'''
+    size = len(keywords)
+    rows = [[0] * size for _ in range(size)]
+    for (y, x), count in pairs.items():
+        value = min(count, 1) if binary else count
+        rows[y][x] = value
+        rows[x][y] = value
+
+    matrix = [[None] + list(keywords)]
+    for keyword, row in zip(keywords, rows):
+        matrix.append([keyword] + row)
+    return matrix
+
+def generate_co_occurrence_matrix(graph: List[List[str]], binary:bool=False, engine:str="sparse"):
     '''Generate co-occurrence matrix based on undirected graph.'''
+    if engine == "dense":
+        return _generate_co_occurrence_matrix_dense(graph, binary)
+    vocabulary, id_graph = encode_graph(graph)
+    return generate_co_occurrence_matrix_ids(id_graph, vocabulary, binary, engine)
+
+def generate_co_occurrence_matrix_ids(graph: List[List[int]], vocabulary: Vocabulary, binary:bool=False, engine:str="sparse"):
+    '''Generate co-occurrence matrix based on undirected graph of keyword IDs.'''
+    if engine == "dense":
+        return _generate_co_occurrence_matrix_dense(vocabulary.decode_graph(graph), binary)
+    keywords, pairs = co_occurrences_ids(graph, vocabulary, engine)
+    return build_matrix(keywords, pairs, binary)
+
+def co_occurrences_ids(graph: List[List[int]], vocabulary: Vocabulary, engine:str="sparse",
+                       min_count:int=1) -> Tuple[List[str], Counter]:
+    '''Returns keywords sorted by frequency and sparse pair counts (keyed by indices into keywords) of a graph of IDs,
+    only pairs co-occurring at least min_count times are kept.'''
+    if engine == "sparse":
+        order, pairs = count_pairs(graph, min_count)
+    elif engine == "incidence":
+        order, pairs = count_pairs_incidence(graph, min_count)
+    elif engine == "dense":
+        keywords, pairs = matrix_to_pairs(_generate_co_occurrence_matrix_dense(vocabulary.decode_graph(graph)))
+        return keywords, Counter({pair: count for pair, count in pairs.items() if count >= min_count})
+    else:
+        raise ValueError(f"Unknown co-occurrence engine: {engine!r}, choose one of {CO_OCCURRENCE_ENGINES}")
+    return vocabulary.decode(order), pairs
+
+def matrix_to_pairs(matrix: List[List[Union[str, int, None]]]) -> Tuple[List[str], Counter]:
+    '''Converts dense co-occurrence matrix back to keywords and sparse pair counts.'''
+    keywords = matrix[0][1:]
+    pairs = Counter()
+    for y, row in enumerate(matrix[1:]):
+        for x in range(y + 1, len(keywords)):
+            if row[x + 1] != 0:
+                pairs[(y, x)] = row[x + 1]
+    return keywords, pairs
+
+def _generate_co_occurrence_matrix_dense(graph: List[List[str]], binary:bool=False):
+    '''Reference implementation: generate co-occurrence matrix by scanning the whole graph for every cell.
+    Kept to check the "sparse" engine against, it is O(V²·N).'''
     all_keywords = list()
     for line in graph:
         for keyword in line:
@@ -106,34 +220,60 @@ def homogenize(graph: List[List[str]]) -> List[List[str]]:
     homogenized_graph = list(list())
     for line in graph:
         homogenized_graph.append(list())
-        for text in line[0]:
+        for text in line:
             homogenized_graph[-1].append(text.lower())
     return homogenized_graph
 
-def lemmatize(graph: List[List[str]], language:str="english") -> List[List[str]]:
-    '''Converts strings in graph to their lemmatized version'''
-    lemmatized_words = list(list())
+# Pipeline components the lemmatizers never read from, skipped when loading a model
+LEMMATIZER_UNUSED_COMPONENTS = ("parser", "senter", "ner")
+
+@lru_cache(maxsize=None)
+def load_nlp(model: str):
+    '''Loads bundled spaCy model (without unused components), only once per process.'''
+    # Imported here, spaCy takes seconds to import and is only needed for lemmatization
+    import spacy
+    return spacy.load(os.path.join(resource_path("models"), model), exclude=LEMMATIZER_UNUSED_COMPONENTS)
+
+def lemmatize_texts(texts: Iterable[str], language:str="english", batch_size:int=1000, n_process:int=1,
+                    cache: LemmaCache=None) -> Dict[str, str]:
+    '''Returns lemmatized version of every unique string in texts.
+
+    Strings are lemmatized in batches through nlp.pipe,
+    n_process > 1 spreads the batches across several processes.
+    Strings found in cache are not lemmatized again, and the spaCy model
+    is not loaded at all when every string is cached.'''
     model = models[language.lower()]
-    nlp = spacy.load(os.path.join(resource_path("models"), model))
-    for line in graph:
-        lemmatized_words.append(list())
-        for text in line:
-            doc = nlp(text)
-            lemmas = [token.lemma_ for token in doc]
-            s = " ".join(lemmas)
-            lemmatized_words[-1].append(s)
-    return lemmatized_words
-
-def exclude_keywords_from_graph(graph: List[List[str]], exclude_keywords: List[str]) -> List[List[str]]:
-    '''Returns graph where given keywords are excluded from graph (Nodes connected to the excluded keywords (nodes) are removed too).'''
-    fixed_graph = list()
-    if exclude_keywords == None:
-        return graph
-    lower_cased = [word.lower().strip() for word in exclude_keywords]
+    model_path = os.path.join(resource_path("models"), model)
 
-    for line in graph:
-        if len(set(line).intersection(set(lower_cased))) != 0:
-            pass
-        else:
-            fixed_graph.append(line)
-    return fixed_graph
+    unique_texts = list(dict.fromkeys(texts))
+    lemmas = dict()
+    if cache is not None:
+        version = read_model_version(model_path)
+        lemmas = cache.get_many(model, version, unique_texts)
+
+    missing = [text for text in unique_texts if text not in lemmas]
+    if missing:
+        nlp = load_nlp(model)
+        new_lemmas = dict()
+        docs = nlp.pipe(missing, batch_size=batch_size, n_process=n_process)
+        for text, doc in zip(missing, docs):
+            new_lemmas[text] = " ".join([token.lemma_ for token in doc])
+        lemmas.update(new_lemmas)
+        if cache is not None:
+            cache.set_many(model, version, new_lemmas)
+    return lemmas
+
+def lemmatize(graph: List[List[str]], language:str="english", batch_size:int=1000, n_process:int=1,
+              cache: LemmaCache=None) -> List[List[str]]:
+    '''Converts strings in graph to their lemmatized version, every unique string is lemmatized only once.'''
+    lemmas = lemmatize_texts((text for line in graph for text in line), language, batch_size, n_process, cache)
+    return [[lemmas[text] for text in line] for line in graph]
+
+def lemmatize_ids(graph: List[List[int]], vocabulary: Vocabulary, language:str="english", batch_size:int=1000, n_process:int=1,
+                  cache: LemmaCache=None) -> Tuple[Vocabulary, List[List[int]]]:
+    '''Converts keywords used in a graph of IDs to their lemmatized version, once per unique keyword.
+    Returns the new vocabulary (keywords that become equal are merged) and graph.'''
+    used = sorted({id_ for line in graph for id_ in line})
+    lemmas = lemmatize_texts(vocabulary.decode(used), language, batch_size, n_process, cache)
+    vocabulary, mapping = vocabulary.remap({id_: lemmas[vocabulary.keywords[id_]] for id_ in used})
+    return vocabulary, remap_graph(graph, mapping)
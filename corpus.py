@@ -0,0 +1,189 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import os
+import sys
+import json
+import mmap
+import struct
+import shutil
+import tempfile
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Sequence
+
+from vocabulary import Vocabulary
+
+CORPUS_MAGIC = b"ARTYKCSR"
+CORPUS_FORMAT_VERSION = 1
+
+# Magic, format version and length of the JSON header
+_PREAMBLE = struct.Struct("<8sII")
+# Arrays start at multiples of 8 bytes, so that they can be viewed in place
+_ALIGNMENT = 8
+# IDs are written to the spill file in blocks of this many values
+_FLUSH_SIZE = 1 << 20
+
+def _padding(size: int) -> int:
+    return -size % _ALIGNMENT
+
+def source_fingerprint(filepaths: List[str], ranges: str, sheet_name: str, delimeter: str) -> Dict[str, Any]:
+    '''Describes input files (path, size, modification time) and reading settings,
+    a corpus is reused only while the fingerprint of its source is the same.'''
+    files = list()
+    for filepath in filepaths:
+        stat = os.stat(filepath)
+        files.append({"path": os.path.abspath(filepath), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+    return {"files": files, "range": ranges, "sheet_name": sheet_name, "delimeter": delimeter}
+
+class Corpus:
+    '''Records of keyword IDs in CSR layout: record i is ids[offsets[i]:offsets[i + 1]].
+
+    The arrays are memory-mapped from a corpus file, so iterating over records
+    doesn't keep them in memory and the operating system pages them in and out.
+    Can be used everywhere a graph of IDs (List[List[int]]) is only iterated.'''
+    def __init__(self, keywords: List[str], counts: Sequence[int], offsets: Sequence[int], ids: Sequence[int],
+                 metadata: Dict[str, Any]=None) -> None:
+        self.keywords = keywords
+        self.counts = counts
+        self.offsets = offsets
+        self.ids = ids
+        self.metadata = metadata or dict()
+        self._file = None
+        self._mmap = None
+
+    @classmethod
+    def open(cls, path: str) -> "Corpus":
+        '''Memory-maps a corpus file written by CorpusWriter.'''
+        f = open(path, "rb")
+        try:
+            magic, version, header_size = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != CORPUS_MAGIC:
+                raise ValueError(f"{path} is not a corpus file.")
+            if version != CORPUS_FORMAT_VERSION:
+                raise ValueError(f"Unsupported corpus format version: {version!r}")
+            header = json.loads(f.read(header_size).decode("utf-8"))
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError(f"{path} was written on a machine with different byte order, rebuild the corpus.")
+
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(data)
+            position = _PREAMBLE.size + header_size
+            position += _padding(position)
+            offsets = view[position:position + 8 * (header["records"] + 1)].cast("q")
+            position += 8 * (header["records"] + 1)
+            ids = view[position:position + 4 * header["ids"]].cast("i")
+            position += 4 * header["ids"]
+            position += _padding(position)
+            counts = view[position:position + 8 * header["keywords"]].cast("q")
+            position += 8 * header["keywords"]
+            keywords = json.loads(bytes(view[position:position + header["keywords_size"]]).decode("utf-8"))
+        except Exception:
+            f.close()
+            raise
+
+        corpus = cls(keywords, counts, offsets, ids, header.get("metadata"))
+        corpus._file = f
+        corpus._mmap = data
+        return corpus
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> List[int]:
+        return self.ids[self.offsets[index]:self.offsets[index + 1]].tolist()
+
+    def __iter__(self) -> Iterator[List[int]]:
+        offsets, ids = self.offsets, self.ids
+        for i in range(len(offsets) - 1):
+            yield ids[offsets[i]:offsets[i + 1]].tolist()
+
+    def __enter__(self) -> "Corpus":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def vocabulary(self) -> Vocabulary:
+        '''Returns vocabulary of the corpus (string table and frequencies).'''
+        vocabulary = Vocabulary()
+        vocabulary.keywords = list(self.keywords)
+        vocabulary.ids = {keyword: id_ for id_, keyword in enumerate(vocabulary.keywords)}
+        vocabulary.counts = list(self.counts)
+        return vocabulary
+
+    def close(self) -> None:
+        if self._mmap == None:
+            return
+        # Views must be released before the map can be closed
+        for view in (self.offsets, self.ids, self.counts):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+        self._mmap = self._file = None
+
+class CorpusWriter:
+    '''Writes records of keyword IDs to a corpus file one by one, without keeping them in memory.
+    IDs are spilled to a temporary file next to the corpus, record offsets are kept in memory (8 bytes per record).'''
+    def __init__(self, path: str, metadata: Dict[str, Any]=None) -> None:
+        self.path = path
+        self.metadata = metadata or dict()
+        self.offsets = array("q", [0])
+        self._buffer = array("i")
+        self._spill = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+
+    def add(self, ids: Iterable[int]) -> None:
+        buffered = len(self._buffer)
+        self._buffer.extend(ids)
+        self.offsets.append(self.offsets[-1] + len(self._buffer) - buffered)
+        if len(self._buffer) >= _FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._buffer.tofile(self._spill)
+        del self._buffer[:]
+
+    def close(self, keywords: List[str], counts: Sequence[int]) -> None:
+        '''Writes the corpus file with the given string table and keyword frequencies.
+        The file is replaced atomically, a corpus mapped from the old file must be closed first.'''
+        self._flush()
+        keywords_data = json.dumps(keywords, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        header = json.dumps({
+            "records": len(self.offsets) - 1,
+            "ids": self.offsets[-1],
+            "keywords": len(keywords),
+            "keywords_size": len(keywords_data),
+            "byteorder": sys.byteorder,
+            "metadata": self.metadata,
+        }).encode("utf-8")
+
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(_PREAMBLE.pack(CORPUS_MAGIC, CORPUS_FORMAT_VERSION, len(header)))
+            f.write(header)
+            f.write(b"\0" * _padding(f.tell()))
+            self.offsets.tofile(f)
+            self._spill.seek(0)
+            shutil.copyfileobj(self._spill, f)
+            f.write(b"\0" * _padding(f.tell()))
+            array("q", counts).tofile(f)
+            f.write(keywords_data)
+        self._spill.close()
+        os.replace(temporary_path, self.path)
+
+def build_corpus(path: str, records: Iterable[List[str]], metadata: Dict[str, Any]=None) -> Corpus:
+    '''Interns records of keywords while writing them to a corpus file, returns the mapped corpus.
+    Only the vocabulary is kept in memory.'''
+    vocabulary = Vocabulary()
+    writer = CorpusWriter(path, metadata)
+    for record in records:
+        writer.add(vocabulary.add(record))
+    writer.close(vocabulary.keywords, vocabulary.counts)
+    return Corpus.open(path)
+
+def write_corpus(path: str, graph: Iterable[Sequence[int]], vocabulary: Vocabulary, metadata: Dict[str, Any]=None) -> Corpus:
+    '''Writes a graph of IDs to a corpus file, returns the mapped corpus.
+    graph can be a generator adding keywords to vocabulary while it is iterated.'''
+    writer = CorpusWriter(path, metadata)
+    for line in graph:
+        writer.add(line)
+    writer.close(vocabulary.keywords, vocabulary.counts)
+    return Corpus.open(path)
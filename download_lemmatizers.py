@@ -3,10 +3,11 @@
 import os
 import pathlib
 
-import spacy
-import spacy.cli.download
-
 def download_model(model_name):
+    # Imported here so that importing models doesn't import spaCy
+    import spacy
+    import spacy.cli.download
+
     spacy.cli.download(model_name)
 
     nlp = spacy.load(model_name)
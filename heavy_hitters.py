@@ -0,0 +1,76 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import heapq
+from typing import List, Dict, Tuple, Iterable, Hashable
+
+# Candidates kept per wanted item when the capacity of a summary isn't given
+CANDIDATES_FACTOR = 50
+
+class SpaceSaving:
+    '''Space-Saving summary (Metwally et al., 2005): approximate counts of the most frequent
+    items of a stream, keeping at most capacity items in memory.
+
+    When the summary is full, a new item replaces the item with the smallest count and
+    takes over its count, which becomes the item's maximum overestimation (error).
+    Every item that occurs more than total / capacity times is guaranteed to be kept.'''
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("Capacity of the summary must be at least 1.")
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = dict()
+        self.errors: Dict[Hashable, int] = dict()
+        self.total = 0
+        # (count, item) of every kept item, counts are updated lazily when looking for the minimum
+        self._heap: List[Tuple[int, Hashable]] = list()
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add(self, item: Hashable) -> None:
+        self.total += 1
+        counts = self.counts
+        count = counts.get(item)
+        if count != None:
+            counts[item] = count + 1
+        elif len(counts) < self.capacity:
+            counts[item] = 1
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (1, item))
+        else:
+            heap = self._heap
+            while True:
+                minimum, victim = heap[0]
+                current = counts[victim]
+                if current == minimum:
+                    break
+                heapq.heapreplace(heap, (current, victim))
+            del counts[victim]
+            del self.errors[victim]
+            counts[item] = minimum + 1
+            self.errors[item] = minimum
+            heapq.heapreplace(heap, (minimum + 1, item))
+
+    def update(self, items: Iterable[Hashable]) -> None:
+        for item in items:
+            self.add(item)
+
+    def most_common(self, n: int=None) -> List[Tuple[Hashable, int]]:
+        '''Returns (item, estimated count) pairs sorted by estimated count.'''
+        items = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return items if n == None else items[:n]
+
+    def guaranteed(self, n: int) -> bool:
+        '''Whether the n items with the largest estimated counts are certainly the n most frequent items:
+        each of them occurs at least as often as any other item can.'''
+        items = self.most_common(n + 1)
+        if len(items) <= n:
+            # Nothing was evicted from a summary that isn't full, so it holds every item
+            return len(self.counts) < self.capacity
+        return min(count - self.errors[item] for item, count in items[:n]) >= items[n][1]
+
+def approximate_top(records: Iterable[Iterable[Hashable]], n: int, capacity: int=None) -> List[Tuple[Hashable, int]]:
+    '''Returns n items of records with the largest estimated counts, see SpaceSaving.'''
+    summary = SpaceSaving(max(capacity or n * CANDIDATES_FACTOR, n))
+    for record in records:
+        summary.update(record)
+    return summary.most_common(n)
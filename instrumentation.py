@@ -0,0 +1,175 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import logging
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Iterator
+
+# Setting up logger
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(filename)s:%(lineno)d]: %(message)s')
+logger = logging.getLogger(__name__)
+
+# Number of functions/allocation sites listed by the profiler and tracemalloc
+PROFILE_TOP = 20
+
+def report_filename(output_filename: str) -> str:
+    '''Returns path of the run report written next to an output file.'''
+    return os.path.splitext(output_filename)[0] + "_report.json"
+
+def profile_filename(output_filename: str) -> str:
+    return os.path.splitext(output_filename)[0] + ".prof"
+
+def peak_rss_mb(children:bool=False) -> float:
+    '''Returns peak resident memory of this process (or of its finished child processes) in MB.'''
+    if sys.platform == "win32":
+        if children:
+            return 0.0
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / 2**20
+
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+def cpu_seconds() -> float:
+    '''CPU time of this process and its finished child processes (workers).'''
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+class Stage:
+    '''Measurements of one stage of a run: times, memory and counters (records, keywords, pairs, cache hits).'''
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self.children_peak_rss_mb = 0.0
+        self.traced_peak_mb = None
+        self.counters: Dict[str, Any] = dict()
+
+    def count(self, **counters) -> None:
+        self.counters.update(counters)
+
+    def count_cache(self, name: str, hits: int, misses: int) -> None:
+        '''Adds hits, misses and hit rate of a cache to the counters.'''
+        total = hits + misses
+        self.count(**{f"{name}_hits": hits, f"{name}_misses": misses,
+                      f"{name}_hit_rate": round(hits / total, 4) if total else None})
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "name": self.name,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "peak_rss_mb": round(self.peak_rss_mb, 3),
+        }
+        if self.children_peak_rss_mb:
+            data["children_peak_rss_mb"] = round(self.children_peak_rss_mb, 3)
+        if self.traced_peak_mb != None:
+            data["traced_peak_mb"] = round(self.traced_peak_mb, 3)
+        data.update(self.counters)
+        return data
+
+class RunReport:
+    '''Collects measurements of every stage of a run.
+
+    Peak RSS is the peak of the process so far (it can only grow), with
+    trace_memory the peak of memory allocated by Python during each stage
+    is measured with tracemalloc as well, which slows the run down.'''
+    def __init__(self, trace_memory:bool=False) -> None:
+        self.trace_memory = trace_memory
+        self.stages: List[Stage] = list()
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.wall_seconds = None
+        self.tracemalloc_top: List[str] = list()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        stage = Stage(name)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        started, cpu_started = time.perf_counter(), cpu_seconds()
+        try:
+            yield stage
+        finally:
+            stage.wall_seconds = time.perf_counter() - started
+            stage.cpu_seconds = cpu_seconds() - cpu_started
+            stage.peak_rss_mb = peak_rss_mb()
+            stage.children_peak_rss_mb = peak_rss_mb(children=True)
+            if self.trace_memory:
+                stage.traced_peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            self.stages.append(stage)
+
+    def finish(self) -> None:
+        '''Stops tracing memory, keeping the largest allocation sites for the report.'''
+        self.wall_seconds = time.perf_counter() - self._started
+        if self.trace_memory and tracemalloc.is_tracing():
+            statistics = tracemalloc.take_snapshot().statistics("lineno")
+            self.tracemalloc_top = [str(statistic) for statistic in statistics[:PROFILE_TOP]]
+            tracemalloc.stop()
+
+    def to_dict(self, settings: Dict[str, Any]=None) -> Dict[str, Any]:
+        data = {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_seconds": round(self.wall_seconds if self.wall_seconds != None else time.perf_counter() - self._started, 6),
+            "peak_rss_mb": round(peak_rss_mb(), 3),
+            "settings": settings or dict(),
+            "stages": [stage.to_dict() for stage in self.stages],
+        }
+        if self.tracemalloc_top:
+            data["tracemalloc_top"] = self.tracemalloc_top
+        return data
+
+    def save(self, path: str, settings: Dict[str, Any]=None) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(settings), f, indent=4, ensure_ascii=False, default=str)
+
+    def summary(self) -> str:
+        lines = [f"{'Stage':<22}{'Wall, s':>10}{'CPU, s':>10}{'Peak RSS, MB':>14}  Counters"]
+        for stage in self.stages:
+            counters = ", ".join(f"{name}={value}" for name, value in stage.counters.items())
+            lines.append(f"{stage.name:<22}{stage.wall_seconds:>10.3f}{stage.cpu_seconds:>10.3f}{stage.peak_rss_mb:>14.1f}  {counters}")
+        return "\n".join(lines)
+
+    def log_summary(self) -> None:
+        logger.info("Run summary:\n" + self.summary())
+
+@contextmanager
+def profiled(output_filename: str) -> Iterator[cProfile.Profile]:
+    '''Profiles the block with cProfile, saves the statistics next to the output
+    (open with snakeviz or pstats) and logs the slowest functions.'''
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        path = profile_filename(output_filename)
+        profile.dump_stats(path)
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        logger.info(f"Profile saved to {path}, slowest functions:\n{stream.getvalue().strip()}")
+
@@ -0,0 +1,92 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import os
+import json
+import time
+import sqlite3
+from typing import Dict, Iterable
+
+LEMMA_CACHE_FILENAME = "lemma_cache.sqlite3"
+DEFAULT_MAX_SIZE = 1_000_000
+
+# SQLite limits the number of "?" variables in one statement
+_QUERY_CHUNK = 500
+
+def read_model_version(model_path: str) -> str:
+    '''Returns version of a spaCy model from its meta.json, without loading spaCy.'''
+    with open(os.path.join(model_path, "meta.json"), encoding="utf-8") as f:
+        return json.load(f)["version"]
+
+class LemmaCache:
+    '''Persistent cache of lemmas shared across runs and languages.
+
+    Lemmas are keyed by (model name, model version, input string), so updating
+    a model never returns stale lemmas. When the cache grows over max_size
+    entries the least recently used ones are evicted.'''
+    def __init__(self, path: str, max_size: int=DEFAULT_MAX_SIZE) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Parallel workers share the cache file, waiting for each other's writes
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute('''CREATE TABLE IF NOT EXISTS lemmas (
+            model TEXT NOT NULL,
+            version TEXT NOT NULL,
+            text TEXT NOT NULL,
+            lemma TEXT NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (model, version, text))''')
+        self.connection.execute("CREATE INDEX IF NOT EXISTS lemmas_last_used ON lemmas (last_used)")
+        self.connection.commit()
+
+    def __enter__(self) -> "LemmaCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM lemmas").fetchone()[0]
+
+    def get_many(self, model: str, version: str, texts: Iterable[str]) -> Dict[str, str]:
+        '''Returns cached lemmas for the given strings, strings that are not cached are left out.'''
+        texts = list(texts)
+        found = dict()
+        for start in range(0, len(texts), _QUERY_CHUNK):
+            chunk = texts[start:start + _QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT text, lemma FROM lemmas WHERE model = ? AND version = ? AND text IN ({placeholders})",
+                [model, version, *chunk])
+            found.update(rows)
+
+        # Refreshing entries so that they survive eviction
+        now = time.time()
+        self.connection.executemany("UPDATE lemmas SET last_used = ? WHERE model = ? AND version = ? AND text = ?",
+                                    [(now, model, version, text) for text in found])
+        self.connection.commit()
+
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def set_many(self, model: str, version: str, lemmas: Dict[str, str]) -> None:
+        '''Stores lemmas of the given strings, evicting least recently used entries over max_size.'''
+        now = time.time()
+        self.connection.executemany("INSERT OR REPLACE INTO lemmas VALUES (?, ?, ?, ?, ?)",
+                                    [(model, version, text, lemma, now) for text, lemma in lemmas.items()])
+        overflow = len(self) - self.max_size
+        if overflow > 0:
+            self.connection.execute("DELETE FROM lemmas WHERE rowid IN (SELECT rowid FROM lemmas ORDER BY last_used LIMIT ?)",
+                                    (overflow,))
+        self.connection.commit()
+
+    def clear(self) -> None:
+        '''Removes every cached lemma.'''
+        self.connection.execute("DELETE FROM lemmas")
+        self.connection.commit()
+        self.connection.execute("VACUUM")
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,161 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import heapq
+from typing import List, Dict, Tuple, Union
+
+from core import Pairs
+
+Adjacency = List[Dict[int, float]]
+
+NETWORK_ANALYSIS_HEADER = ("Keyword", "Links", "Total link strength", "Cluster", "Strongest neighbours")
+
+# Local moving stops when a pass improves modularity less than this
+MODULARITY_TOLERANCE = 1e-7
+
+def build_adjacency(num_nodes: int, pairs: Pairs, binary:bool=False) -> Adjacency:
+    '''Returns neighbours of every node with link weights, pairs with zero weight are skipped.'''
+    adjacency = [dict() for _ in range(num_nodes)]
+    for (y, x), weight in pairs.items():
+        if weight <= 0 or y == x:
+            continue
+        if binary:
+            weight = 1
+        adjacency[y][x] = weight
+        adjacency[x][y] = weight
+    return adjacency
+
+def top_neighbours(adjacency: Adjacency, k:int=5) -> List[List[Tuple[int, float]]]:
+    '''Returns k strongest (neighbour, weight) links of every node, ties are broken by lower index.'''
+    return [heapq.nsmallest(k, neighbours.items(), key=lambda item: (-item[1], item[0])) for neighbours in adjacency]
+
+def _move_nodes(adjacency: Adjacency, loops: List[float], resolution: float) -> Tuple[List[int], bool]:
+    '''Local moving phase of Louvain: moves nodes one by one to the neighbouring community
+    with the largest modularity gain until no move improves it. Returns community of every node
+    (numbered from 0) and whether any node was moved.'''
+    num_nodes = len(adjacency)
+    degrees = [sum(neighbours.values()) + 2 * loops[node] for node, neighbours in enumerate(adjacency)]
+    total = sum(degrees)
+    community = list(range(num_nodes))
+    totals = list(degrees)
+    moved = False
+    if total == 0:
+        return community, moved
+
+    while True:
+        gain = 0.0
+        for node in range(num_nodes):
+            neighbours = adjacency[node]
+            if not neighbours:
+                continue
+            current = community[node]
+            degree = degrees[node]
+            weights = dict()
+            for neighbour, weight in neighbours.items():
+                target = community[neighbour]
+                weights[target] = weights.get(target, 0) + weight
+
+            totals[current] -= degree
+            stay_gain = weights.get(current, 0) - resolution * totals[current] * degree / total
+            best, best_gain = current, stay_gain
+            for target, weight in weights.items():
+                target_gain = weight - resolution * totals[target] * degree / total
+                if target_gain > best_gain:
+                    best, best_gain = target, target_gain
+            totals[best] += degree
+            if best != current:
+                gain += best_gain - stay_gain
+                community[node] = best
+                moved = True
+        if gain * 2 / total <= MODULARITY_TOLERANCE:
+            break
+
+    numbers = dict()
+    return [numbers.setdefault(c, len(numbers)) for c in community], moved
+
+def _aggregate(adjacency: Adjacency, loops: List[float], community: List[int]) -> Tuple[Adjacency, List[float]]:
+    '''Returns network of communities, links inside a community become its self-loop.'''
+    num_communities = max(community) + 1
+    new_adjacency = [dict() for _ in range(num_communities)]
+    new_loops = [0.0] * num_communities
+    for node, neighbours in enumerate(adjacency):
+        source = community[node]
+        new_loops[source] += loops[node]
+        for neighbour, weight in neighbours.items():
+            target = community[neighbour]
+            if target == source:
+                # Every internal link is seen from both of its ends
+                new_loops[source] += weight / 2
+            else:
+                new_adjacency[source][target] = new_adjacency[source].get(target, 0) + weight
+    return new_adjacency, new_loops
+
+def louvain(adjacency: Adjacency, resolution:float=1.0) -> List[int]:
+    '''Clusters nodes with the Louvain method (local moving of nodes and aggregation of
+    communities, repeated while modularity improves). Nodes are visited in index order,
+    so results are reproducible. Clusters are numbered from 1, the largest first.'''
+    membership = list(range(len(adjacency)))
+    loops = [0.0] * len(adjacency)
+    while True:
+        community, moved = _move_nodes(adjacency, loops, resolution)
+        if not moved:
+            break
+        membership = [community[c] for c in membership]
+        adjacency, loops = _aggregate(adjacency, loops, community)
+
+    sizes = dict()
+    for c in membership:
+        sizes[c] = sizes.get(c, 0) + 1
+    order = sorted(sizes, key=lambda c: (-sizes[c], c))
+    numbers = {c: number for number, c in enumerate(order, start=1)}
+    return [numbers[c] for c in membership]
+
+def modularity(adjacency: Adjacency, clusters: List[int], resolution:float=1.0) -> float:
+    '''Returns modularity of the clustering: Σ_c (L_c / m - γ·(d_c / 2m)²), where L_c is weight of links
+    inside cluster c, d_c is total link strength of its nodes and m is weight of all links.'''
+    internal = dict()
+    degrees = dict()
+    total = 0.0
+    for node, neighbours in enumerate(adjacency):
+        cluster = clusters[node]
+        for neighbour, weight in neighbours.items():
+            total += weight
+            degrees[cluster] = degrees.get(cluster, 0) + weight
+            if clusters[neighbour] == cluster:
+                internal[cluster] = internal.get(cluster, 0) + weight
+    if total == 0:
+        return 0.0
+    return sum(internal.get(c, 0) / total - resolution * (degree / total) ** 2 for c, degree in degrees.items())
+
+class NetworkAnalysis:
+    '''Links, total link strength (weighted degree), strongest neighbours and clusters
+    of every keyword, computed on the sparse pair counts (or similarities).'''
+    def __init__(self, keywords: List[str], pairs: Pairs, binary:bool=False, top_k:int=5, resolution:float=1.0) -> None:
+        self.keywords = keywords
+        adjacency = build_adjacency(len(keywords), pairs, binary)
+        self.links = [len(neighbours) for neighbours in adjacency]
+        self.strengths = [sum(neighbours.values()) for neighbours in adjacency]
+        self.num_links = sum(self.links) // 2
+        self.total_link_strength = sum(self.strengths) / 2
+        self.neighbours = top_neighbours(adjacency, top_k)
+        self.clusters = louvain(adjacency, resolution)
+        self.num_clusters = max(self.clusters, default=0)
+        self.modularity = modularity(adjacency, self.clusters, resolution)
+
+    def rows(self) -> List[tuple]:
+        '''Returns header and a row of every keyword, in the order of keywords.'''
+        rows = [NETWORK_ANALYSIS_HEADER]
+        for i, keyword in enumerate(self.keywords):
+            neighbours = "; ".join(f"{self.keywords[j]} ({_format_weight(weight)})" for j, weight in self.neighbours[i])
+            rows.append((keyword, self.links[i], _format_weight(self.strengths[i]), self.clusters[i], neighbours))
+        return rows
+
+    def summary(self) -> Dict[str, Union[int, float]]:
+        return {"nodes": len(self.keywords), "links": self.num_links,
+                "total_link_strength": _format_weight(self.total_link_strength),
+                "clusters": self.num_clusters, "modularity": round(self.modularity, 4)}
+
+def _format_weight(weight: float) -> Union[int, float]:
+    '''Counts stay integers, similarities are rounded.'''
+    if isinstance(weight, int) or float(weight).is_integer():
+        return int(weight)
+    return round(weight, 6)
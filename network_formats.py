@@ -0,0 +1,116 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import os
+import csv
+import logging
+from typing import List, Dict, Tuple, Iterator, Any
+from xml.sax.saxutils import escape
+
+from spreadsheet import generate_excel, iter_matrix_rows
+
+# Setting up logger
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(filename)s:%(lineno)d]: %(message)s')
+logger = logging.getLogger(__name__)
+
+# Output format chosen by the extension of the output file
+OUTPUT_FORMATS = {
+    ".xlsx": "xlsx",
+    ".csv": "edges",
+    ".graphml": "graphml",
+    ".net": "pajek",
+}
+
+def resolve_output_format(output_filename: str, output_format:str="auto") -> str:
+    '''Returns output format, detecting it from the extension of output_filename if output_format is "auto".'''
+    if output_format != "auto":
+        return output_format
+    extension = os.path.splitext(output_filename)[1].lower()
+    if extension not in OUTPUT_FORMATS:
+        logger.warning(f"Unknown output file extension {repr(extension)}, saving as xlsx.")
+    return OUTPUT_FORMATS.get(extension, "xlsx")
+
+def iter_edges(keywords: List[str], pairs: Dict[Tuple[int, int], int], binary:bool=False) -> Iterator[Tuple[int, int, int]]:
+    '''Yields (source, target, weight) of every nonzero pair, sources and targets are indices into keywords.'''
+    for (y, x) in sorted(pairs):
+        count = pairs[(y, x)]
+        if count > 0:
+            yield y, x, min(count, 1) if binary else count
+
+def write_edge_list(keywords: List[str], pairs: Dict[Tuple[int, int], int], output_filename: str, binary:bool=False) -> None:
+    '''Write weighted edge list (Source, Target, Weight) as .csv, readable by Gephi and NodeXL.'''
+    with open(output_filename, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Source", "Target", "Weight"])
+        for y, x, weight in iter_edges(keywords, pairs, binary):
+            writer.writerow([keywords[y], keywords[x], weight])
+
+def write_graphml(keywords: List[str], pairs: Dict[Tuple[int, int], int], output_filename: str, binary:bool=False,
+                  frequency_analysis: List[Tuple[Any, int]]=None) -> None:
+    '''Write undirected weighted graph as GraphML, with keyword frequency as a node attribute if given.'''
+    frequencies = dict(frequency_analysis) if frequency_analysis != None else None
+    # Similarity measures give fractional weights
+    weight_type = "int" if binary or all(isinstance(weight, int) for weight in pairs.values()) else "double"
+    with open(output_filename, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        f.write('  <key id="label" for="node" attr.name="label" attr.type="string"/>\n')
+        if frequencies != None:
+            f.write('  <key id="frequency" for="node" attr.name="frequency" attr.type="int"/>\n')
+        f.write(f'  <key id="weight" for="edge" attr.name="weight" attr.type="{weight_type}"/>\n')
+        f.write('  <graph id="co-occurrence" edgedefault="undirected">\n')
+        for i, keyword in enumerate(keywords):
+            f.write(f'    <node id="n{i}"><data key="label">{escape(str(keyword))}</data>')
+            if frequencies != None and keyword in frequencies:
+                f.write(f'<data key="frequency">{frequencies[keyword]}</data>')
+            f.write('</node>\n')
+        for y, x, weight in iter_edges(keywords, pairs, binary):
+            f.write(f'    <edge source="n{y}" target="n{x}"><data key="weight">{weight}</data></edge>\n')
+        f.write('  </graph>\n')
+        f.write('</graphml>\n')
+
+def write_pajek(keywords: List[str], pairs: Dict[Tuple[int, int], int], output_filename: str, binary:bool=False) -> None:
+    '''Write undirected weighted graph as Pajek .net file.'''
+    with open(output_filename, "w", encoding="utf-8", newline="\r\n") as f:
+        f.write(f"*Vertices {len(keywords)}\n")
+        for i, keyword in enumerate(keywords, start=1):
+            # Pajek labels are double quoted and can't contain double quotes
+            label = str(keyword).replace('"', "'")
+            f.write(f'{i} "{label}"\n')
+        f.write("*Edges\n")
+        for y, x, weight in iter_edges(keywords, pairs, binary):
+            f.write(f"{y + 1} {x + 1} {weight}\n")
+
+def write_frequency_analysis(frequency_analysis: List[Tuple[Any, int]], output_filename: str) -> None:
+    '''Write frequency analysis as .csv (Keyword, Frequency).'''
+    with open(output_filename, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Keyword", "Frequency"])
+        writer.writerows(frequency_analysis)
+
+def write_network_analysis(network_analysis: List[tuple], output_filename: str) -> None:
+    '''Write rows of network analysis (with a header) as .csv.'''
+    with open(output_filename, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(network_analysis)
+
+def write_network(keywords: List[str], pairs: Dict[Tuple[int, int], int], output_filename: str, binary:bool=False,
+                  frequency_analysis: List[Tuple[Any, int]]=None, output_format:str="auto", network_analysis: List[tuple]=None) -> None:
+    '''Write co-occurrence network in the given (or detected from output_filename) format.
+    Formats other than xlsx write frequency analysis and network analysis to separate
+    "<name>_frequency.csv" and "<name>_network.csv" files.'''
+    output_format = resolve_output_format(output_filename, output_format)
+    if output_format == "xlsx":
+        generate_excel(iter_matrix_rows(keywords, pairs, binary), output_filename, frequency_analysis, network_analysis)
+        return
+    elif output_format == "edges":
+        write_edge_list(keywords, pairs, output_filename, binary)
+    elif output_format == "graphml":
+        write_graphml(keywords, pairs, output_filename, binary, frequency_analysis)
+    elif output_format == "pajek":
+        write_pajek(keywords, pairs, output_filename, binary)
+    else:
+        raise ValueError(f"Unknown output format: {output_format!r}, choose one of {sorted(set(OUTPUT_FORMATS.values()))}")
+
+    if frequency_analysis != None:
+        write_frequency_analysis(frequency_analysis, os.path.splitext(output_filename)[0] + "_frequency.csv")
+    if network_analysis != None:
+        write_network_analysis(network_analysis, os.path.splitext(output_filename)[0] + "_network.csv")
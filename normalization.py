@@ -0,0 +1,97 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import csv
+import hashlib
+from typing import List, Dict, Tuple, Iterable, Iterator
+
+from vocabulary import Vocabulary
+
+# Header of VOSviewer thesaurus files, the first line is skipped when it matches
+THESAURUS_HEADER = ("label", "replace by")
+
+def read_thesaurus(path: str, homogenize:bool=False) -> Dict[str, str]:
+    '''Reads VOSviewer-style thesaurus file: tab-delimeted "label" and "replace by" columns.
+    An empty "replace by" removes the label from records, same as in VOSviewer.
+    With homogenize labels and replacements are lower-cased, as keywords they are matched against.'''
+    thesaurus = dict()
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for number, row in enumerate(csv.reader(f, delimiter="\t")):
+            if not row or not row[0].strip():
+                continue
+            if number == 0 and tuple(cell.strip().lower() for cell in row[:2]) == THESAURUS_HEADER:
+                continue
+            label = row[0].strip()
+            replacement = row[1].strip() if len(row) > 1 else ""
+            if homogenize:
+                label, replacement = label.lower(), replacement.lower()
+            thesaurus[label] = replacement
+    return thesaurus
+
+def thesaurus_digest(thesaurus: Dict[str, str]) -> str:
+    '''Returns a short hash of a thesaurus, to tell apart snapshots built with different ones.'''
+    if not thesaurus:
+        return None
+    text = "\n".join(f"{label}\t{replacement}" for label, replacement in sorted(thesaurus.items()))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class Normalizer:
+    '''Normalizes keywords of records in a single pass: strip, lower-case (homogenize),
+    thesaurus replacement, exclusion and per-record deduplication.
+
+    Every unique keyword is normalized once, results are kept in a memo
+    shared by all graphs normalized with this normalizer.'''
+    def __init__(self, homogenize:bool=False, thesaurus: Dict[str, str]=None, exclude_keywords: Iterable[str]=None) -> None:
+        self.homogenize = homogenize
+        self.thesaurus = thesaurus or dict()
+        self.exclude_keywords = set(exclude_keywords or ())
+        self.memo: Dict[str, str] = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, keyword: str) -> str:
+        '''Returns normalized keyword, an empty string if it must be removed from records.'''
+        normalized = self.memo.get(keyword)
+        if normalized != None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            normalized = keyword.strip()
+            if self.homogenize:
+                normalized = normalized.lower()
+            normalized = self.thesaurus.get(normalized, normalized)
+            self.memo[keyword] = normalized
+        return normalized
+
+    def normalize_ids(self, graph: List[List[int]], vocabulary: Vocabulary, kept: List[int]=None) -> Tuple[Vocabulary, List[List[int]]]:
+        '''Returns new vocabulary (counted on the returned graph) and graph of normalized IDs.
+        Records containing an excluded keyword are removed, removed (empty) keywords and
+        repeated keywords inside a record are dropped, records left empty are removed.'''
+        new_vocabulary = Vocabulary()
+        new_graph = list(self.iter_normalized_ids(graph, vocabulary, new_vocabulary, kept))
+        return new_vocabulary, new_graph
+
+    def iter_normalized_ids(self, graph: Iterable[List[int]], vocabulary: Vocabulary, new_vocabulary: Vocabulary,
+                            kept: List[int]=None) -> Iterator[List[int]]:
+        '''Lazily yields normalized records as IDs of new_vocabulary, which is filled and counted while iterating.
+        If kept is given, indices of the yielded records are appended to it.'''
+        # Old ID -> normalized keyword, None for excluded ones, False until the keyword is first seen
+        targets = [False] * len(vocabulary)
+        for index, line in enumerate(graph):
+            record = list()
+            for id_ in line:
+                target = targets[id_]
+                if target is False:
+                    target = self.normalize(vocabulary.keywords[id_])
+                    if target in self.exclude_keywords:
+                        target = None
+                    targets[id_] = target
+                if target == None:
+                    break
+                if target:
+                    record.append(target)
+            else:
+                if record:
+                    if kept != None:
+                        kept.append(index)
+                    # dict keeps the first occurrence of every keyword in order
+                    yield new_vocabulary.add(dict.fromkeys(record))
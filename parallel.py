@@ -0,0 +1,180 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import os
+import logging
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import List, Dict, Tuple, Iterator, Any, Union, Callable
+
+from core import lemmatize_ids
+from analysis_state import AnalysisState
+from lemma_cache import LemmaCache
+from normalization import Normalizer
+from spreadsheet import (iter_file_records, iter_records, iter_savedrecs_block_values, resolve_savedrecs_ranges,
+                         split_savedrecs, parse_range)
+from vocabulary import Vocabulary, encode_graph, remap_graph
+
+# Setting up logger
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(filename)s:%(lineno)d]: %(message)s')
+logger = logging.getLogger(__name__)
+
+# Records per task, when there are less files than workers and files are split into chunks
+DEFAULT_CHUNK_SIZE = 20000
+# Tab-delimeted files are split into blocks read by the workers themselves,
+# about this many blocks per worker, but not smaller than MIN_BLOCK_SIZE bytes
+BLOCKS_PER_WORKER = 4
+MIN_BLOCK_SIZE = 1 << 20
+# Tasks submitted but not yet merged, per worker, so that only a few chunks are held in memory at once
+TASKS_IN_FLIGHT = 2
+
+@dataclass
+class IngestSettings:
+    '''Settings every worker needs to read, normalize and count its part of the records.'''
+    ranges: str
+    sheet_name: str = None
+    delimeter: str = ";"
+    exclude_keywords: List[str] = field(default_factory=list)
+    homogenize: bool = False
+    thesaurus: Dict[str, str] = None
+    lemmatize: bool = False
+    lemmatization_language: str = "english"
+    lemma_cache_path: str = None
+    lemma_cache_size: int = 0
+    options: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class Block:
+    '''Rows of a tab-delimeted file from byte start up to byte end (see spreadsheet.split_savedrecs),
+    read by a worker for one resolved part of the ranges.'''
+    filepath: str
+    ranges: str
+    start: int
+    end: int
+    first_row: int
+
+# A task is a path of a file or a block of it read by the worker, or a chunk of records read by the main process
+Task = Union[str, Block, List[List[str]]]
+
+# Settings of the current pool, sent to every worker once instead of with every task (see _init_worker)
+_settings: IngestSettings = None
+
+def _init_worker(settings: IngestSettings) -> None:
+    global _settings
+    _settings = settings
+
+def _load(task: Task, settings: IngestSettings) -> Tuple[Vocabulary, List[List[int]]]:
+    if isinstance(task, str):
+        return encode_graph(iter_file_records(task, settings.ranges, settings.sheet_name, settings.delimeter))
+    if isinstance(task, Block):
+        values = iter_savedrecs_block_values(task.filepath, task.ranges, task.start, task.end, task.first_row)
+        return encode_graph(iter_records(values, settings.delimeter))
+    return encode_graph(task)
+
+def _load_task(task: Task) -> Tuple[Vocabulary, List[List[int]]]:
+    return _load(task, _settings)
+
+def _count_task(task: Task) -> Tuple[Vocabulary, AnalysisState, Counter]:
+    '''Reads, normalizes and counts one task, returns vocabulary as read, counted state and cache counters.'''
+    settings = _settings
+    raw_vocabulary, graph = _load(task, settings)
+    counters = Counter()
+
+    normalizer = Normalizer(settings.homogenize, settings.thesaurus, settings.exclude_keywords)
+    vocabulary, graph = normalizer.normalize_ids(graph, raw_vocabulary)
+    counters.update(normalization_memo_hits=normalizer.hits, normalization_memo_misses=normalizer.misses)
+    if settings.lemmatize:
+        cache = LemmaCache(settings.lemma_cache_path, max_size=settings.lemma_cache_size) if settings.lemma_cache_path != None else None
+        try:
+            # Workers are already separate processes, so spaCy runs in a single one
+            vocabulary, graph = lemmatize_ids(graph, vocabulary, language=settings.lemmatization_language, n_process=1, cache=cache)
+        finally:
+            if cache != None:
+                counters.update(lemma_cache_hits=cache.hits, lemma_cache_misses=cache.misses)
+                cache.close()
+
+    state = AnalysisState(settings.options)
+    state.add_graph(graph, vocabulary)
+    return raw_vocabulary, state, counters
+
+def _chunks(records: Iterator[List[str]], size: int) -> Iterator[List[List[str]]]:
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _savedrecs_tasks(filepath: str, settings: IngestSettings, workers: int) -> Iterator[Block]:
+    '''Yields blocks of a tab-delimeted file for every part of the ranges, in order of the records.'''
+    block_size = max(os.path.getsize(filepath) // (workers * BLOCKS_PER_WORKER), MIN_BLOCK_SIZE)
+    blocks = split_savedrecs(filepath, block_size)
+    for range_ in resolve_savedrecs_ranges(filepath, settings.ranges).split("|"):
+        max_row = parse_range(range_)[3]
+        for start, end, first_row in blocks:
+            if max_row != None and first_row > max_row:
+                break
+            yield Block(filepath, range_, start, end, first_row)
+
+def _tasks(filepaths: List[str], settings: IngestSettings, workers: int, chunk_size: int) -> Iterator[Task]:
+    '''Yields one task per file when there are at least as many files as workers. Otherwise tab-delimeted
+    files are split into blocks read by the workers, other files are read here in chunks of records.'''
+    if len(filepaths) >= workers:
+        yield from filepaths
+        return
+    for filepath in filepaths:
+        if filepath.endswith(".txt"):
+            yield from _savedrecs_tasks(filepath, settings, workers)
+        else:
+            records = iter_file_records(filepath, settings.ranges, settings.sheet_name, settings.delimeter)
+            yield from _chunks(records, chunk_size)
+
+def _ordered_results(executor: ProcessPoolExecutor, function: Callable, tasks: Iterator[Task], workers: int,
+                     local_function: Callable=None) -> Iterator[Any]:
+    '''Yields results of function for every task in order of the tasks. At most TASKS_IN_FLIGHT tasks per worker
+    are submitted before their results are taken, unlike executor.map, which submits all of them at once.
+    With local_function chunks of records are processed here by it, instead of sending them to a worker.'''
+    pending = deque()
+    for task in tasks:
+        if local_function != None and isinstance(task, list):
+            future = Future()
+            future.set_result(local_function(task))
+        else:
+            future = executor.submit(function, task)
+        pending.append(future)
+        if len(pending) >= workers * TASKS_IN_FLIGHT:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def load_parallel(filepaths: List[str], settings: IngestSettings, workers: int,
+                  chunk_size:int=DEFAULT_CHUNK_SIZE) -> Tuple[Vocabulary, List[List[int]]]:
+    '''Reads files in worker processes, returns merged vocabulary and graph of IDs
+    (same as reading the files one after another). Chunks of records read by this process
+    are interned here, sending them to a worker would cost more than interning them.'''
+    vocabulary = Vocabulary()
+    graph = list()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(settings,)) as executor:
+        tasks = _tasks(filepaths, settings, workers, chunk_size)
+        # Results come in order of the tasks, which keeps the order of the records
+        results = _ordered_results(executor, _load_task, tasks, workers, local_function=lambda chunk: _load(chunk, settings))
+        for part_vocabulary, part_graph in results:
+            graph.extend(remap_graph(part_graph, vocabulary.update(part_vocabulary)))
+    return vocabulary, graph
+
+def count_parallel(filepaths: List[str], settings: IngestSettings, workers: int,
+                   chunk_size:int=DEFAULT_CHUNK_SIZE) -> Tuple[Vocabulary, AnalysisState, Counter]:
+    '''Reads, normalizes (see normalization.Normalizer, lemmatize) and counts pairs of files in worker processes.
+    Returns merged vocabulary as read (before normalization), merged counted state and summed
+    cache counters of the workers (normalization memo and lemma cache hits and misses).
+    Merging in order of the tasks gives the same counts and keyword order as a single process run.'''
+    raw_vocabulary = Vocabulary()
+    state = AnalysisState(settings.options)
+    counters = Counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(settings,)) as executor:
+        tasks = _tasks(filepaths, settings, workers, chunk_size)
+        for part_vocabulary, part_state, part_counters in _ordered_results(executor, _count_task, tasks, workers):
+            raw_vocabulary.update(part_vocabulary)
+            state.merge(part_state)
+            counters.update(part_counters)
+    return raw_vocabulary, state, counters
@@ -0,0 +1,608 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import os
+import json
+import shutil
+import tempfile
+import logging
+from collections import Counter
+from dataclasses import dataclass, field, fields, asdict
+from typing import List, Dict, Tuple, Set, Any, Iterable
+
+from core import co_occurrences_ids, lemmatize_ids, filter_ids_by_frequency, iter_filtered_ids
+from path_utils import get_execution_folder
+from lemma_cache import LemmaCache, LEMMA_CACHE_FILENAME, DEFAULT_MAX_SIZE
+from spreadsheet import iter_file_records, iter_file_records_with_values
+from parallel import IngestSettings, load_parallel, count_parallel
+from network_formats import write_network, resolve_output_format
+from similarity import prune_and_normalize, document_frequencies
+from analysis_state import AnalysisState, state_options
+from vocabulary import Vocabulary
+from normalization import Normalizer, read_thesaurus, thesaurus_digest
+from corpus import Corpus, build_corpus, write_corpus, source_fingerprint
+from time_slices import TimeSlices, make_slices, parse_year, slice_label, slice_filename
+from network_analysis import NetworkAnalysis
+from heavy_hitters import SpaceSaving, CANDIDATES_FACTOR
+from instrumentation import RunReport, Stage, profiled, report_filename
+
+# Setting up logger
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(filename)s:%(lineno)d]: %(message)s')
+logger = logging.getLogger(__name__)
+
+def split_exclude_keywords(exclude_keywords: str) -> List[str]:
+    '''Splits keywords to exclude, written using semicolons (;) or commas (,).'''
+    if not exclude_keywords:
+        return list()
+    main_delimeter = ";"
+    if len(exclude_keywords.split(";")) > 1:
+        main_delimeter = ";"
+    elif len(exclude_keywords.split(",")) > 1:
+        main_delimeter = ","
+    return [word.strip() for word in exclude_keywords.lower().split(main_delimeter)]
+
+@dataclass
+class AnalysisOptions:
+    '''Settings of one co-occurrence analysis, same as the arguments of co-occurrence-analysis command.'''
+    filepaths: List[str]
+    range: str
+    save_as: str
+    sheet_name: str = None
+    delimeter: str = ";"
+    exclude_keywords: List[str] = field(default_factory=list)
+    binary: bool = False
+    homogenize: bool = False
+    thesaurus: str = None
+    lemmatize: bool = False
+    lemmatization_language: str = "English"
+    lemmatization_processes: int = 1
+    no_lemma_cache: bool = False
+    clear_lemma_cache: bool = False
+    lemma_cache_size: int = DEFAULT_MAX_SIZE
+    filter: int = 0
+    approximate_filter: bool = False
+    filter_candidates: int = 0
+    no_recount: bool = False
+    frequency: bool = False
+    min_count: int = 1
+    top_k: int = 0
+    similarity: str = "count"
+    network_analysis: bool = False
+    top_neighbours: int = 5
+    resolution: float = 1.0
+    engine: str = "sparse"
+    output_format: str = "auto"
+    workers: int = 1
+    load_state: str = None
+    save_state: str = None
+    corpus: str = None
+    year_range: str = None
+    time_slices: str = "year"
+    slice_size: int = 5
+    slice_step: int = 1
+    no_run_report: bool = False
+    profile: bool = False
+    trace_memory: bool = False
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "AnalysisOptions":
+        '''Creates options from a dictionary (parsed arguments or a job of a batch file), converting value types.'''
+        names = {f.name: f for f in fields(cls)}
+        unknown = set(values) - set(names)
+        if unknown:
+            raise ValueError(f"Unknown analysis options: {sorted(unknown)}")
+
+        converted = dict()
+        for name, value in values.items():
+            if value != None and names[name].type is int:
+                value = int(value)
+            elif value != None and names[name].type is float:
+                value = float(value)
+            elif name == "exclude_keywords" and isinstance(value, str):
+                value = split_exclude_keywords(value)
+            elif name == "exclude_keywords" and value != None:
+                value = [word.lower().strip() for word in value]
+            elif name == "filepaths" and isinstance(value, str):
+                value = [value]
+            converted[name] = value
+        if converted.get("exclude_keywords") == None:
+            converted.pop("exclude_keywords", None)
+        return cls(**converted)
+
+    @classmethod
+    def from_args(cls, args) -> "AnalysisOptions":
+        values = vars(args).copy()
+        values.pop("command", None)
+        return cls.from_dict(values)
+
+def log_settings(options: AnalysisOptions, header: str="") -> None:
+    logger.info(f'''The settings are:
+    ----------------------------------------------------
+                {header}
+    ----------------------------------------------------
+        Excel spreadsheet path: {options.filepaths}
+        Sheet name: {"active" if options.sheet_name == None else options.sheet_name}
+        Range: {options.range}
+        Lemmatization: {options.lemmatize}
+        Lemmatization language: {options.lemmatization_language}
+        Lemmatization processes: {options.lemmatization_processes}
+        Lemma cache: {"disabled" if options.no_lemma_cache else f"up to {options.lemma_cache_size} lemmas"}{" (cleared)" if options.clear_lemma_cache else ""}
+        Save As: {options.save_as}
+        Output format: {options.output_format}
+        Delimeter: {repr(options.delimeter)}
+        Keywords to exclude: {options.exclude_keywords}
+        Binary: {options.binary}
+        Convert to lower case: {options.homogenize}
+        Thesaurus: {options.thesaurus}
+        Filter (Leave only): {options.filter if options.filter != 0 else "All keywords"}
+        Approximate filter: {f"{options.filter_candidates or 'default number of'} candidates{', no recount' if options.no_recount else ''}" if options.approximate_filter else False}
+        Frequency analysis: {options.frequency}
+        Minimum co-occurrences: {options.min_count}
+        Strongest links per keyword: {options.top_k if options.top_k != 0 else "All links"}
+        Similarity measure: {options.similarity}
+        Network analysis: {f"{options.top_neighbours} strongest neighbours, resolution {options.resolution}" if options.network_analysis else False}
+        Counting engine: {options.engine}
+        Worker processes: {options.workers}
+        Load analysis state: {options.load_state}
+        Save analysis state: {options.save_state}
+        Corpus file: {options.corpus}
+        Time slices: {"disabled" if options.year_range == None else f"{options.time_slices} of {options.year_range}"}
+        Run report: {"disabled" if options.no_run_report else "enabled"}{", cProfile" if options.profile else ""}{", tracemalloc" if options.trace_memory else ""}
+    ----------------------------------------------------''')
+
+class Pipeline:
+    '''Co-occurrence analysis: load → filter → normalize → lemmatize → count → write.
+
+    Every stage is a method, so the pipeline can be used from Python as well.
+    Inputs read by a pipeline are kept, so several analyses of the same files
+    (see run_batch) read them only once. spaCy models are loaded once per
+    process anyway (core.load_nlp).'''
+    def __init__(self, lemma_cache_path: str=None) -> None:
+        self.lemma_cache_path = lemma_cache_path or os.path.join(get_execution_folder(), LEMMA_CACHE_FILENAME)
+        self._loaded: Dict[Tuple, Tuple[Vocabulary, List[List[int]]]] = dict()
+        # Publication year of every loaded record, for inputs loaded with a year range
+        self._years: Dict[Tuple, List[int]] = dict()
+        self._normalizers: Dict[Tuple, Normalizer] = dict()
+        # Inputs of several analyses of a batch, loaded and kept even when workers could count them directly
+        self._shared_inputs: Set[Tuple] = set()
+        # Folder of temporary corpus files of the current run, see _spill
+        self._spill_folder = None
+        self._spilled: List[Corpus] = list()
+
+    def _load_key(self, options: AnalysisOptions) -> Tuple:
+        # Inputs loaded into a corpus are memory-mapped, other inputs are kept as lists
+        return (tuple(options.filepaths), options.range, options.sheet_name, options.delimeter, options.year_range, options.corpus)
+
+    def share_inputs(self, jobs: List[AnalysisOptions]) -> None:
+        '''Marks inputs read by more than one of the analyses, so that they are read once and reused by the others.'''
+        loads = Counter(self._load_key(options) for options in jobs)
+        self._shared_inputs = {key for key, count in loads.items() if count > 1}
+
+    def _ingest_settings(self, options: AnalysisOptions) -> IngestSettings:
+        return IngestSettings(ranges=options.range, sheet_name=options.sheet_name, delimeter=options.delimeter,
+                              exclude_keywords=options.exclude_keywords, homogenize=options.homogenize,
+                              thesaurus=self.normalizer(options).thesaurus,
+                              lemmatize=options.lemmatize, lemmatization_language=options.lemmatization_language,
+                              lemma_cache_path=None if options.no_lemma_cache else self.lemma_cache_path,
+                              lemma_cache_size=options.lemma_cache_size, options=self.state_options(options))
+
+    def state_options(self, options: AnalysisOptions) -> Dict[str, Any]:
+        return state_options(options.homogenize, options.lemmatize, options.lemmatization_language,
+                             options.delimeter, options.exclude_keywords, thesaurus_digest(self.normalizer(options).thesaurus))
+
+    def normalizer(self, options: AnalysisOptions) -> Normalizer:
+        '''Returns normalizer for the options, analyses with the same normalization share it (and its memo).'''
+        key = (options.homogenize, options.thesaurus, tuple(options.exclude_keywords))
+        if key not in self._normalizers:
+            thesaurus = read_thesaurus(options.thesaurus, options.homogenize) if options.thesaurus != None else None
+            self._normalizers[key] = Normalizer(options.homogenize, thesaurus, options.exclude_keywords)
+        return self._normalizers[key]
+
+    def load(self, options: AnalysisOptions) -> Tuple[Vocabulary, List[List[int]]]:
+        '''Reads records of options.filepaths as a graph of keyword IDs, files that were already read are reused.
+        With options.corpus the graph is a memory-mapped Corpus, reused by later runs while the input files don't change.'''
+        key = self._load_key(options)
+        if key not in self._loaded:
+            if options.year_range != None:
+                # Years are read from the same rows as the keywords
+                vocabulary = Vocabulary()
+                graph = list()
+                years = list()
+                for filepath in options.filepaths:
+                    for record, value in iter_file_records_with_values(filepath, options.range, options.year_range,
+                                                                       options.sheet_name, options.delimeter):
+                        graph.append(vocabulary.add(record))
+                        years.append(parse_year(value))
+                self._years[key] = years
+            elif options.corpus != None:
+                corpus = self.load_corpus(options)
+                vocabulary, graph = corpus.vocabulary(), corpus
+            elif options.workers > 1:
+                vocabulary, graph = load_parallel(options.filepaths, self._ingest_settings(options), options.workers)
+            else:
+                # Keywords are interned to integer IDs while loading, counting their frequency
+                vocabulary = Vocabulary()
+                graph = list()
+                for record in self.iter_records(options):
+                    graph.append(vocabulary.add(record))
+            self._loaded[key] = (vocabulary, graph)
+        # Stages never modify the graph or vocabulary in place, so they can be shared between analyses
+        return self._loaded[key]
+
+    def load_corpus(self, options: AnalysisOptions) -> Corpus:
+        '''Maps corpus file of options.corpus, (re)building it when it was made from different input.'''
+        fingerprint = source_fingerprint(options.filepaths, options.range, options.sheet_name, options.delimeter)
+        if os.path.exists(options.corpus):
+            corpus = Corpus.open(options.corpus)
+            if corpus.metadata.get("source") == fingerprint:
+                logger.info(f"Reusing corpus {options.corpus} ({len(corpus)} records).")
+                return corpus
+            corpus.close()
+            logger.info(f"Input files changed since {options.corpus} was built, rebuilding it.")
+
+        return build_corpus(options.corpus, self.iter_records(options), {"source": fingerprint})
+
+    def iter_records(self, options: AnalysisOptions) -> Iterable[List[str]]:
+        for filepath in options.filepaths:
+            yield from iter_file_records(filepath, options.range, options.sheet_name, options.delimeter)
+
+    def load_top(self, options: AnalysisOptions, stage: Stage=None) -> Tuple[Vocabulary, List[List[int]]]:
+        '''Reads records with only the options.filter most frequent keywords, without keeping every keyword in memory.
+
+        The first pass finds candidates with a Space-Saving summary of options.filter_candidates keywords,
+        the second pass reads only the candidates, counting them exactly. Then the most frequent of them are
+        kept, same as filter does (with no_recount the candidates are only as many as options.filter).
+        The result is exact when the summary holds all of the most frequent keywords.'''
+        capacity = max(options.filter_candidates or options.filter * CANDIDATES_FACTOR, options.filter)
+        summary = SpaceSaving(capacity)
+        for record in self.iter_records(options):
+            summary.update(record)
+        guaranteed = summary.guaranteed(options.filter)
+        if not guaranteed:
+            logger.info(f"The {options.filter} most frequent keywords might differ from exact filtering, "
+                        "increase the number of candidates to make them exact.")
+
+        candidates = {keyword for keyword, count in summary.most_common(options.filter if options.no_recount else None)}
+        vocabulary = Vocabulary()
+        graph = list()
+        for record in self.iter_records(options):
+            record = [keyword for keyword in record if keyword in candidates]
+            if record:
+                graph.append(vocabulary.add(record))
+        if not options.no_recount:
+            graph = filter_ids_by_frequency(graph, vocabulary, options.filter)
+        if stage != None:
+            stage.count(occurrences=summary.total, candidates=len(candidates), top_guaranteed=guaranteed,
+                        records=len(graph), keywords=len(vocabulary))
+        return vocabulary, graph
+
+    def _spill(self, graph: Iterable[List[int]], vocabulary: Vocabulary, name: str) -> Corpus:
+        '''Writes records of a stage working on a corpus to a temporary corpus, so that they aren't kept in memory.'''
+        corpus = write_corpus(os.path.join(self._spill_folder, f"{name}.artykc"), graph, vocabulary)
+        self._spilled.append(corpus)
+        return corpus
+
+    def filter(self, graph: List[List[int]], vocabulary: Vocabulary, num: int, kept: List[int]=None) -> List[List[int]]:
+        '''Keeps num most frequent keywords. If kept is given, indices of the records left are appended to it.'''
+        if isinstance(graph, Corpus):
+            return self._spill(iter_filtered_ids(graph, set(vocabulary.top_ids(num)), kept), vocabulary, "filtered")
+        return filter_ids_by_frequency(graph, vocabulary, num, kept)
+
+    def normalize(self, graph: List[List[int]], vocabulary: Vocabulary, options: AnalysisOptions,
+                  kept: List[int]=None) -> Tuple[Vocabulary, List[List[int]]]:
+        '''See normalization.Normalizer. If kept is given, indices of the records left are appended to it.'''
+        if isinstance(graph, Corpus):
+            new_vocabulary = Vocabulary()
+            records = self.normalizer(options).iter_normalized_ids(graph, vocabulary, new_vocabulary, kept)
+            return new_vocabulary, self._spill(records, new_vocabulary, "normalized")
+        return self.normalizer(options).normalize_ids(graph, vocabulary, kept)
+
+    def lemmatize(self, graph: List[List[int]], vocabulary: Vocabulary, options: AnalysisOptions,
+                  stage: Stage=None) -> Tuple[Vocabulary, List[List[int]]]:
+        lemma_cache = None
+        if not options.no_lemma_cache:
+            lemma_cache = LemmaCache(self.lemma_cache_path, max_size=options.lemma_cache_size)
+        try:
+            vocabulary, graph = lemmatize_ids(graph, vocabulary, language=options.lemmatization_language,
+                                              n_process=options.lemmatization_processes, cache=lemma_cache)
+        finally:
+            if lemma_cache != None:
+                logger.info(f"Lemma cache: {lemma_cache.hits} hits, {lemma_cache.misses} misses.")
+                if stage != None:
+                    stage.count_cache("lemma_cache", lemma_cache.hits, lemma_cache.misses)
+                lemma_cache.close()
+        return vocabulary, graph
+
+    def count(self, graph: List[List[int]], vocabulary: Vocabulary, engine:str="sparse", min_count:int=1) -> Tuple[List[str], Counter]:
+        return co_occurrences_ids(graph, vocabulary, engine=engine, min_count=min_count)
+
+    def analyse_network(self, keywords: List[str], pairs: Counter, options: AnalysisOptions, binary: bool,
+                        stage: Stage=None) -> NetworkAnalysis:
+        analysis = NetworkAnalysis(keywords, pairs, binary, top_k=options.top_neighbours, resolution=options.resolution)
+        summary = analysis.summary()
+        logger.info(f"Network: {summary['nodes']} keywords, {summary['links']} links, total link strength {summary['total_link_strength']}, "
+                    f"{summary['clusters']} clusters, modularity {summary['modularity']}.")
+        if stage != None:
+            stage.count(**summary)
+        return analysis
+
+    def write(self, keywords: List[str], pairs: Counter, options: AnalysisOptions, binary: bool,
+              frequency_analysis: List[Tuple[str, int]]=None, network_analysis: NetworkAnalysis=None) -> None:
+        write_network(keywords, pairs, options.save_as, binary, frequency_analysis=frequency_analysis, output_format=options.output_format,
+                      network_analysis=network_analysis.rows() if network_analysis != None else None)
+
+    def run(self, options: AnalysisOptions) -> RunReport:
+        '''Runs a whole analysis and writes its output to options.save_as.
+        Returns measurements of every stage, which are also saved next to the output.'''
+        report = RunReport(trace_memory=options.trace_memory)
+        try:
+            if options.profile:
+                with profiled(options.save_as):
+                    self._run(options, report)
+            else:
+                self._run(options, report)
+        finally:
+            if self._spill_folder != None:
+                # Mapped files can't be removed on Windows
+                for corpus in self._spilled:
+                    corpus.close()
+                self._spilled.clear()
+                shutil.rmtree(self._spill_folder, ignore_errors=True)
+                self._spill_folder = None
+            # Report of a failed run shows the stages done before the failure
+            report.finish()
+            report.log_summary()
+            if not options.no_run_report:
+                report.save(report_filename(options.save_as), asdict(options))
+                logger.info(f"Run report saved to {report_filename(options.save_as)}")
+        return report
+
+    def _run(self, options: AnalysisOptions, report: RunReport) -> None:
+        # Runs merging a loaded snapshot filter and count frequencies on the merged (normalized) counts,
+        # other runs on the keywords as read from the files
+        merged = options.load_state != None
+        incremental = merged or options.save_state != None
+        state_settings = self.state_options(options)
+        if options.year_range != None and (incremental or options.corpus != None):
+            raise ValueError("Time slices can't be combined with analysis state snapshots or corpus files.")
+
+        if options.lemmatize and options.clear_lemma_cache:
+            logger.info("Clearing lemma cache.")
+            with LemmaCache(self.lemma_cache_path) as lemma_cache:
+                lemma_cache.clear()
+
+        most_common = None
+        state = None
+        already_loaded = self._load_key(options) in self._loaded
+        years = None
+        streamed = options.approximate_filter and options.filter != 0 and not incremental
+        if streamed and (options.corpus != None or options.year_range != None or already_loaded):
+            logger.info("Approximate filter isn't used with corpus files, time slices or already loaded files, filtering exactly.")
+            streamed = False
+        if (options.workers > 1 and (merged or options.filter == 0) and not already_loaded
+                and options.corpus == None and options.year_range == None and self._load_key(options) not in self._shared_inputs):
+            # Every stage up to counting is done per record, so workers can do all of them
+            logger.info(f"Loading, normalizing and counting {options.filepaths} in {options.workers} worker processes.")
+            with report.stage("parallel_count") as stage:
+                raw_vocabulary, state, counters = count_parallel(options.filepaths, self._ingest_settings(options), options.workers)
+                stage.count(workers=options.workers, records=state.num_records, keywords=len(raw_vocabulary),
+                            normalized_keywords=len(state.vocabulary), pairs=len(state.pairs))
+                stage.count_cache("normalization_memo", counters["normalization_memo_hits"], counters["normalization_memo_misses"])
+                if options.lemmatize and not options.no_lemma_cache:
+                    stage.count_cache("lemma_cache", counters["lemma_cache_hits"], counters["lemma_cache_misses"])
+            if options.frequency and not merged:
+                most_common = raw_vocabulary.most_common()
+            logger.info(f"Successfully loaded and counted {state.num_records} records.")
+        elif streamed:
+            logger.info(f"Loading {options.filter} most frequent keywords of {options.filepaths}.")
+            with report.stage("load_top") as stage:
+                vocabulary, graph = self.load_top(options, stage)
+            logger.info(f"Successfully loaded and filtered {options.filepaths}.")
+        else:
+            logger.info(f"Loading {options.filepaths} file.")
+            # Filtering needs frequencies of all records and inputs shared by a batch are kept,
+            # so then workers only read the files (see load)
+            with report.stage("load") as stage:
+                vocabulary, graph = self.load(options)
+                stage.count(records=len(graph), keywords=len(vocabulary), reused_input=already_loaded)
+                if isinstance(graph, Corpus):
+                    stage.count(corpus=options.corpus)
+                    # Stages working on a corpus spill their records next to it
+                    self._spill_folder = tempfile.mkdtemp(prefix="artyk-", dir=os.path.dirname(os.path.abspath(options.corpus)))
+            years = self._years.get(self._load_key(options))
+            logger.info(f"Successfully loaded and read {options.filepaths}.")
+
+        if state == None:
+            unfiltered_vocabulary, unfiltered_graph = vocabulary, graph
+            if not merged:
+                # Counting frequency
+                if options.frequency:
+                    logger.info("Calculating frequency.")
+                    with report.stage("frequency") as stage:
+                        most_common = vocabulary.most_common()
+                        stage.count(keywords=len(most_common))
+                    logger.info("Finished calculating frequency.")
+
+                if options.filter != 0 and not streamed:
+                    logger.info(f"Starting to filter down to {options.filter} keywords.")
+                    with report.stage("filter") as stage:
+                        kept = list() if years != None else None
+                        graph = self.filter(graph, vocabulary, options.filter, kept)
+                        years = [years[i] for i in kept] if years != None else None
+                        stage.count(records=len(graph))
+                    logger.info("Finished filtering.")
+
+            vocabulary, graph, years = self._normalize_stages(graph, vocabulary, years, options, report)
+
+            if incremental:
+                if merged or options.filter == 0:
+                    state_vocabulary, state_graph = vocabulary, graph
+                else:
+                    # The snapshot keeps every record, while the output of this run is filtered same as without snapshots
+                    logger.info("Normalizing all records for the analysis state.")
+                    state_vocabulary, state_graph, _ = self._normalize_stages(unfiltered_graph, unfiltered_vocabulary, None, options, report)
+                with report.stage("add_to_state") as stage:
+                    state = AnalysisState(state_settings)
+                    state.add_graph(state_graph, state_vocabulary)
+                    stage.count(records=state.num_records, keywords=len(state.vocabulary), pairs=len(state.pairs))
+
+        logger.info("Generating co-occurrence matrix.")
+        frequencies = None
+        if state != None:
+            if options.load_state != None:
+                logger.info(f"Loading analysis state from {options.load_state}")
+                with report.stage("load_state") as stage:
+                    loaded_state = AnalysisState.load(options.load_state)
+                    loaded_state.check_compatible(state_settings)
+                    logger.info(f"Loaded {loaded_state.num_records} records, adding {state.num_records} new records.")
+                    loaded_state.merge(state)
+                    state = loaded_state
+                    stage.count(records=state.num_records, keywords=len(state.vocabulary), pairs=len(state.pairs))
+            if options.save_state != None:
+                logger.info(f"Saving analysis state to {options.save_state}")
+                with report.stage("save_state"):
+                    state.save(options.save_state)
+
+        if state != None and (merged or options.filter == 0):
+            with report.stage("count") as stage:
+                keywords, pairs, frequencies = state.co_occurrences(options.filter, options.min_count)
+                stage.count(keywords=len(keywords), pairs=len(pairs))
+            num_records = state.num_records
+            if options.frequency and merged:
+                most_common = state.vocabulary.most_common()
+        else:
+            with report.stage("count") as stage:
+                keywords, pairs = self.count(graph, vocabulary, engine=options.engine, min_count=options.min_count)
+                stage.count(engine=options.engine, keywords=len(keywords), pairs=len(pairs))
+            num_records = len(graph)
+        logger.info(f"Successfully generated co-occurrence matrix ({len(keywords)} keywords, {len(pairs)} nonzero pairs).")
+
+        binary = options.binary
+        if self._prunes(options):
+            logger.info("Pruning and normalizing co-occurrences.")
+            with report.stage("prune_normalize") as stage:
+                if frequencies == None and options.similarity != "count":
+                    frequencies = document_frequencies(graph, vocabulary, keywords)
+                pairs = self.prune(pairs, frequencies, num_records, options)
+                stage.count(pairs=len(pairs))
+            if binary and options.similarity != "count":
+                logger.warning("Binary matrix is ignored when a similarity measure is selected.")
+                binary = False
+            logger.info(f"Finished pruning and normalizing, {len(pairs)} links left.")
+
+        analysis = None
+        if options.network_analysis:
+            logger.info("Analysing co-occurrence network.")
+            with report.stage("network_analysis") as stage:
+                analysis = self.analyse_network(keywords, pairs, options, binary, stage=stage)
+
+        logger.info(f"Writing to {options.save_as}")
+        with report.stage("write") as stage:
+            self.write(keywords, pairs, options, binary, frequency_analysis=most_common, network_analysis=analysis)
+            stage.count(output_format=resolve_output_format(options.save_as, options.output_format))
+
+        if years != None:
+            self.write_time_slices(graph, vocabulary, years, options, binary, report)
+
+    def _normalize_stages(self, graph: List[List[int]], vocabulary: Vocabulary, years: List[int], options: AnalysisOptions,
+                          report: RunReport) -> Tuple[Vocabulary, List[List[int]], List[int]]:
+        '''Normalizes and (with options.lemmatize) lemmatizes a graph, keeping years of the records left.'''
+        # Stripping, lower-casing, thesaurus, exclusion and deduplication are done in one pass
+        logger.info("Starting to normalize cell values.")
+        with report.stage("normalize") as stage:
+            normalizer = self.normalizer(options)
+            hits, misses = normalizer.hits, normalizer.misses
+            kept = list() if years != None else None
+            vocabulary, graph = self.normalize(graph, vocabulary, options, kept)
+            years = [years[i] for i in kept] if years != None else None
+            stage.count(records=len(graph), keywords=len(vocabulary))
+            stage.count_cache("normalization_memo", normalizer.hits - hits, normalizer.misses - misses)
+        logger.info("Successfully finished normalizing cells.")
+
+        if options.lemmatize:
+            logger.info(f"Starting to lemmatize cell values.")
+            with report.stage("lemmatize") as stage:
+                vocabulary, graph = self.lemmatize(graph, vocabulary, options, stage=stage)
+                stage.count(records=len(graph), keywords=len(vocabulary))
+            logger.info("Successfully finished lemmatizing cells.")
+        return vocabulary, graph, years
+
+    def _prunes(self, options: AnalysisOptions) -> bool:
+        # Minimum pair count is already applied by counting
+        return options.top_k != 0 or options.similarity != "count"
+
+    def prune(self, pairs: Counter, frequencies: List[int], num_records: int, options: AnalysisOptions) -> Counter:
+        return prune_and_normalize(pairs, frequencies, num_records, top_k=options.top_k, measure=options.similarity)
+
+    def write_time_slices(self, graph: List[List[int]], vocabulary: Vocabulary, years: List[int],
+                          options: AnalysisOptions, binary: bool, report: RunReport) -> None:
+        '''Counts every time slice in one pass over the records and writes each to its own file next to the output.'''
+        slices = make_slices(years, options.time_slices, options.slice_size, options.slice_step)
+        logger.info(f"Counting {len(slices)} time slices: {', '.join(slice_label(*slice_) for slice_ in slices)}")
+        with report.stage("count_time_slices") as stage:
+            time_slices = TimeSlices(slices)
+            time_slices.add_graph(graph, years)
+            stage.count(slices=len(slices), records_without_year=years.count(None))
+
+        with report.stage("write_time_slices") as stage:
+            for index, (first, last) in enumerate(slices):
+                keywords, pairs, frequencies = time_slices.co_occurrences(index, vocabulary, options.min_count)
+                if self._prunes(options):
+                    pairs = self.prune(pairs, frequencies, time_slices.num_records[index], options)
+                output_filename = slice_filename(options.save_as, first, last)
+                logger.info(f"Writing {slice_label(first, last)} ({time_slices.num_records[index]} records, "
+                            f"{len(keywords)} keywords, {len(pairs)} links) to {output_filename}")
+                most_common = time_slices.most_common(index, vocabulary) if options.frequency else None
+                analysis = self.analyse_network(keywords, pairs, options, binary).rows() if options.network_analysis else None
+                write_network(keywords, pairs, output_filename, binary, frequency_analysis=most_common,
+                              output_format=options.output_format, network_analysis=analysis)
+            stage.count(slices=len(slices))
+
+# Options holding paths, relative paths in a job file are relative to the job file
+_PATH_OPTIONS = ("save_as", "load_state", "save_state", "thesaurus", "corpus")
+
+def load_jobs(job_filepath: str) -> List[AnalysisOptions]:
+    '''Reads batch job file (JSON), for example:
+    {
+        "defaults": {"filepaths": ["savedrecs.txt"], "range": "DE", "homogenize": true},
+        "jobs": [
+            {"save_as": "top100.xlsx", "filter": 100},
+            {"save_as": "all.graphml", "similarity": "association", "min_count": 2}
+        ]
+    }
+    Every job is the defaults updated with its own options.'''
+    with open(job_filepath, encoding="utf-8") as f:
+        data = json.load(f)
+    base_folder = os.path.dirname(os.path.abspath(job_filepath))
+
+    def resolve(path: str) -> str:
+        return os.path.join(base_folder, path) if path != None else None
+
+    jobs = list()
+    for job in data["jobs"]:
+        values = dict(data.get("defaults", {}))
+        values.update(job)
+        if isinstance(values.get("filepaths"), str):
+            values["filepaths"] = [values["filepaths"]]
+        values["filepaths"] = [resolve(path) for path in values.get("filepaths", [])]
+        for name in _PATH_OPTIONS:
+            if name in values:
+                values[name] = resolve(values[name])
+        jobs.append(AnalysisOptions.from_dict(values))
+    return jobs
+
+def run_batch(job_filepath: str, pipeline: Pipeline=None) -> int:
+    '''Runs every job of a batch job file with one pipeline, so inputs are read once.
+    A failed job is logged and skipped, returns the number of failed jobs.'''
+    pipeline = pipeline or Pipeline()
+    jobs = load_jobs(job_filepath)
+    pipeline.share_inputs(jobs)
+    failed = 0
+    for number, options in enumerate(jobs, start=1):
+        logger.info(f"Starting job {number}/{len(jobs)}: {options.save_as}")
+        try:
+            pipeline.run(options)
+        except Exception:
+            logger.exception(f"Job {number}/{len(jobs)} ({options.save_as}) failed.")
+            failed += 1
+    logger.info(f"Finished {len(jobs) - failed}/{len(jobs)} jobs.")
+    return failed
@@ -0,0 +1,70 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import heapq
+import math
+from collections import Counter
+from typing import List
+
+from core import Pairs
+from vocabulary import Vocabulary
+
+# "count" keeps raw co-occurrence counts
+SIMILARITY_MEASURES = ("count", "association", "jaccard", "cosine", "inclusion")
+
+def document_frequencies(graph: List[List[int]], vocabulary: Vocabulary, keywords: List[str]) -> List[int]:
+    '''Returns number of records containing each of keywords (a keyword repeated in one record is counted once).'''
+    c = Counter(id_ for line in graph for id_ in set(line))
+    return [c[vocabulary.ids[keyword]] for keyword in keywords]
+
+def prune_pairs(pairs: Pairs, min_count:int=1) -> Pairs:
+    '''Drops pairs that co-occur less than min_count times.'''
+    if min_count <= 1:
+        return pairs
+    return Counter({pair: count for pair, count in pairs.items() if count >= min_count})
+
+def normalize_pairs(pairs: Pairs, frequencies: List[int], num_records: int, measure:str="count") -> Pairs:
+    '''Converts co-occurrence counts c of keywords i, j to a similarity measure,
+    using the number of records n_i, n_j containing each of them:
+        association - c·N / (n_i·n_j), observed over expected co-occurrences (N is the number of records)
+        jaccard - c / (n_i + n_j - c)
+        cosine - c / √(n_i·n_j)
+        inclusion - c / min(n_i, n_j)'''
+    if measure == "count":
+        return pairs
+    elif measure == "association":
+        similarity = lambda c, n_i, n_j: c * num_records / (n_i * n_j)
+    elif measure == "jaccard":
+        similarity = lambda c, n_i, n_j: c / (n_i + n_j - c)
+    elif measure == "cosine":
+        similarity = lambda c, n_i, n_j: c / math.sqrt(n_i * n_j)
+    elif measure == "inclusion":
+        similarity = lambda c, n_i, n_j: c / min(n_i, n_j)
+    else:
+        raise ValueError(f"Unknown similarity measure: {measure!r}, choose one of {SIMILARITY_MEASURES}")
+
+    return {(y, x): similarity(count, frequencies[y], frequencies[x]) for (y, x), count in pairs.items()}
+
+def keep_top_neighbours(pairs: Pairs, top_k: int) -> Pairs:
+    '''Keeps only the top_k strongest links of every keyword,
+    a link survives if it is among the strongest of either of its keywords.'''
+    if top_k <= 0:
+        return pairs
+    neighbours = dict()
+    for pair, weight in pairs.items():
+        for node in pair:
+            neighbours.setdefault(node, list()).append((weight, pair))
+
+    kept = set()
+    for links in neighbours.values():
+        # Ties prefer more frequent keywords (lower indices), so that the result doesn't depend on insertion order
+        kept.update(pair for weight, pair in heapq.nlargest(top_k, links, key=lambda link: (link[0], -link[1][0], -link[1][1])))
+    return type(pairs)({pair: weight for pair, weight in pairs.items() if pair in kept})
+
+def prune_and_normalize(pairs: Pairs, frequencies: List[int], num_records: int,
+                        min_count:int=1, top_k:int=0, measure:str="count") -> Pairs:
+    '''Applies minimum pair count, similarity measure and top-k neighbours (in that order) to sparse pair counts,
+    frequencies are numbers of records containing each keyword (unused by the count measure).
+    Pipeline applies min_count while counting (see core.co_occurrences_ids), so it passes the default here.'''
+    pairs = prune_pairs(pairs, min_count)
+    pairs = normalize_pairs(pairs, frequencies, num_records, measure)
+    return keep_top_neighbours(pairs, top_k)
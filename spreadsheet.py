@@ -1,21 +1,17 @@
 # Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
 
 import os
+import re
+import csv
+import codecs
 import logging
 import time
-from typing import List, Union, Tuple, Any
-
-import xlsxwriter
-import openpyxl
-# ---------------------------------------
-# NOTE: Do not remove these pyexcel imports as it requires direct imports to successfully compile using pyinstaller
-import pyexcel as p
-import pyexcel_xls 
-import pyexcel_xlsx
-import pyexcel_xlsxw
-import pyexcel_io
-import pyexcel_io.writers
-# ---------------------------------------
+from itertools import chain, zip_longest
+from typing import List, Dict, Union, Tuple, Any, Callable, Iterable, Iterator, Sequence
+
+# NOTE: xlsxwriter, openpyxl and pyexcel are imported inside the functions that use them,
+# so that starting the program doesn't pay for their import time.
+# pyexcel plugins are listed as hidden imports in compile.py for pyinstaller.
 
 # Setting up logger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(filename)s:%(lineno)d]: %(message)s')
@@ -29,34 +25,66 @@ def in_use(filename):
     except:    
         return True
 
-def generate_excel(matrix: List[List[Union[str, int]]],
-                   output_filename: str, frequency_analysis: List[tuple[Any, int]]=None) -> None:
-    '''Generate xlsx file from co-occurrence matrix.'''
-    try:
-        workbook = xlsxwriter.Workbook(output_filename)
-        worksheet = workbook.add_worksheet("Co-occurrence matrix")
-        col = 0
+# Excel's limit of columns in a sheet, the matrix needs one more column for keywords
+EXCEL_MAX_COLUMNS = 16384
 
-        for row, data in enumerate(matrix):
-            worksheet.write_row(row, col, data)
+def generate_excel(matrix: Iterable[List[Union[str, int, None]]], output_filename: str,
+                   frequency_analysis: List[tuple[Any, int]]=None, network_analysis: List[tuple]=None) -> None:
+    '''Generate xlsx file from co-occurrence matrix rows (a list or an iterator, see iter_matrix_rows),
+    streamed with xlsxwriter's constant_memory mode. Rows of network_analysis (with a header)
+    are written to the "Network Analysis" sheet.'''
+    import xlsxwriter
+    rows = iter(matrix)
+    header = next(rows, None)
+    if header != None:
+        if len(header) > EXCEL_MAX_COLUMNS:
+            raise ValueError(f"{len(header) - 1} keywords don't fit into Excel's {EXCEL_MAX_COLUMNS} columns, "
+                             "filter them or save as edge list (.csv), GraphML (.graphml) or Pajek (.net) instead.")
+        rows = chain([header], rows)
 
-        if frequency_analysis != None:
-            second_worksheet = workbook.add_worksheet("Frequency Analysis")
-            col = 0
+    workbook = xlsxwriter.Workbook(output_filename, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Co-occurrence matrix")
+    col = 0
 
-            for row, data in enumerate(frequency_analysis):
-                second_worksheet.write_row(row, col, data)
+    for row, data in enumerate(rows):
+        worksheet.write_row(row, col, data)
+
+    for name, sheet_rows in (("Frequency Analysis", frequency_analysis), ("Network Analysis", network_analysis)):
+        if sheet_rows != None:
+            worksheet = workbook.add_worksheet(name)
+            for row, data in enumerate(sheet_rows):
+                worksheet.write_row(row, col, data)
+
+    while True:
+        try:
+            workbook.close()
+            break
+        except xlsxwriter.exceptions.FileCreateError:
+            # Rows are already written, so closing is retried once the file is closed
+            logger.info(f"You are trying to save to an opened file: {repr(output_filename)}, please close that file.")
+            while in_use(output_filename):
+                time.sleep(0.1)
+            logger.info(f"You have closed: {repr(output_filename)}, continuing saving to that file.")
+
+def iter_matrix_rows(keywords: List[str], pairs: Dict[Tuple[int, int], int], binary:bool=False) -> Iterator[List[Union[str, int, None]]]:
+    '''Yields rows of the dense co-occurrence matrix (with header row and column) one by one,
+    building each row from sparse pair counts, so that the whole matrix is never held in memory.'''
+    adjacency = [dict() for _ in keywords]
+    for (y, x), count in pairs.items():
+        value = min(count, 1) if binary else count
+        adjacency[y][x] = value
+        adjacency[x][y] = value
+
+    yield [None] + list(keywords)
+    for keyword, neighbours in zip(keywords, adjacency):
+        row = [0] * len(keywords)
+        for x, value in neighbours.items():
+            row[x] = value
+        yield [keyword] + row
 
-        workbook.close()
-    except xlsxwriter.exceptions.FileCreateError:
-        logger.info(f"You are trying to save to an opened file: {repr(output_filename)}, please close that file.")
-        while in_use(output_filename):
-            time.sleep(0.1)
-        logger.info(f"You have closed: {repr(output_filename)}, continuing saving to that file.")
-        generate_excel(matrix, output_filename, frequency_analysis)
-            
 def create_xlsx_copy(filename:str) -> None:
     '''Convert file with other spreadsheet filetype format to .xlsx'''
+    import pyexcel as p
     if filename.endswith(".xls"):
         p.save_book_as(file_name=filename,
                     dest_file_name=f"{filename}x")
@@ -70,46 +98,144 @@ The tested formats are: (csv, xlsx, xls)''')
         new_filename = filename.split(".")[0] + ".xlsx"
         p.save_book_as(filename=filename, dest_file_name=new_filename)
 
-def load_xls_sheet_values(xls_filepath: str, ranges: str, sheet_name=None, delimeter:str=";") -> List[List[str]]:
-    '''Reads given XLS(X) specific sheet and returns values of cells in given range.'''
-    # Converting xls file to .xlsx because openpyxl doesn't support xls
-    is_temp = False
-    if xls_filepath.split(".")[1] != "xlsx":
-        is_temp = True
-        create_xlsx_copy(xls_filepath)
-        xls_filepath = xls_filepath.split(".")[0] + ".xlsx"
-    # Loading workbook
-    workbook = openpyxl.load_workbook(xls_filepath, True)
-    
-    # If specific sheet selected use it, active sheet otherwise
-    if sheet_name != None:
-        workbook.active = workbook[sheet_name]
-    curr = workbook.active
+def parse_range(range_: str) -> Tuple[int, int, int, int]:
+    '''Converts Excel-style range ("E1:E18", "$E$1:$E$18", "E5", "E:E" or rows "2:301") to 1-based
+    (min_col, min_row, max_col, max_row). Rows without a column are read from the first column,
+    max_row is None when the range has no end row.'''
+    bounds = list()
+    for corner in re.sub(r"[\s$]", "", range_).upper().split(":"):
+        match = re.fullmatch(r"([A-Z]*)(\d*)", corner)
+        if match == None or corner == "":
+            raise ValueError(f"Invalid cell range: {repr(range_)}")
+        column = 0
+        for letter in match.group(1):
+            column = column * 26 + ord(letter) - ord("A") + 1
+        bounds.append((column or 1, int(match.group(2)) if match.group(2) else None))
+    if len(bounds) == 1:
+        bounds.append(bounds[0])
+    elif len(bounds) != 2:
+        raise ValueError(f"Invalid cell range: {repr(range_)}")
+
+    (min_col, min_row), (max_col, max_row) = bounds
+    return min_col, min_row or 1, max_col, max_row
 
-    texts = list()
+def get_column_letter(column: int) -> str:
+    '''Converts 1-based column number to its Excel letter ("A", "Z", "AA").'''
+    letters = ""
+    while column > 0:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
 
-    # Extracting cell values
+def split_cell(value: Any, delimeter:str=";") -> Union[List[str], None]:
+    '''Splits cell value into stripped keywords, returns None for empty cells.'''
+    if value == None or value == "":
+        return None
+    return [word.strip() for word in str(value).split(delimeter)]
+
+def iter_range_rows(rows: Callable[[], Iterable[Sequence[Any]]], ranges: str, first_row:int=1) -> Iterator[Any]:
+    '''Yields values of the first column of every range in ranges ("E1:E18|A6:A19").
+    rows returns a fresh iterator over the sheet's rows, it is called once per range,
+    so that only one row is held in memory. first_row is the number of the first row rows yields.'''
     for range_ in ranges.split("|"):
-        for cell in curr[range_]:
-            try:
-                if cell[0].value != None:
-                    texts.append(list())
-                    for word in cell[0].value.split(delimeter):
-                        texts[-1].append(word.strip())
+        min_col, min_row, max_col, max_row = parse_range(range_)
+        for row_number, row in enumerate(rows(), start=first_row):
+            if row_number < min_row:
+                continue
+            if max_row != None and row_number > max_row:
+                break
+            yield row[min_col - 1] if min_col <= len(row) else None
 
-            except TypeError as e:
-                pass
+def iter_records(values: Iterable[Any], delimeter:str=";") -> Iterator[List[str]]:
+    '''Splits cell values into records, skipping empty cells.'''
+    for value in values:
+        record = split_cell(value, delimeter)
+        if record != None:
+            yield record
 
-    workbook.close()
-    if is_temp:
-        os.remove(xls_filepath)
+def iter_csv_values(csv_filepath: str, ranges: str) -> Iterator[Any]:
+    '''Lazily reads values of cells (empty ones too) in given range of a .csv file.'''
+    # Scopus exports keep abstracts in a single field, which can exceed the default limit
+    csv.field_size_limit(2**31 - 1)
+
+    def rows():
+        with open(csv_filepath, encoding="utf-8-sig", newline="") as f:
+            yield from csv.reader(f)
+
+    yield from iter_range_rows(rows, ranges)
+
+def iter_xls_values(xls_filepath: str, ranges: str, sheet_name=None) -> Iterator[Any]:
+    '''Lazily reads values of cells (empty ones too) in given range of a legacy .xls file.'''
+    import xlrd
+    workbook = xlrd.open_workbook(xls_filepath, on_demand=True)
+    try:
+        # First sheet is used as the active one, same as when the file is converted to .xlsx
+        sheet = workbook.sheet_by_name(sheet_name) if sheet_name != None else workbook.sheet_by_index(0)
+
+        def rows():
+            for row_number in range(sheet.nrows):
+                yield sheet.row_values(row_number)
 
-    return texts
+        yield from iter_range_rows(rows, ranges)
+    finally:
+        workbook.release_resources()
 
-def get_active_sheetname(xls_filepath: str) -> List[str]:
-    # Converting xls file to .xlsx because openpyxl doesn't support xls
+def iter_xlsx_values(xlsx_filepath: str, ranges: str, sheet_name=None) -> Iterator[Any]:
+    '''Lazily reads values of cells (empty ones too) in given range of a .xlsx file.'''
+    import openpyxl
+    workbook = openpyxl.load_workbook(xlsx_filepath, True)
+    try:
+        # If specific sheet selected use it, active sheet otherwise
+        sheet = workbook[sheet_name] if sheet_name != None else workbook.active
+
+        for range_ in ranges.split("|"):
+            min_col, min_row, max_col, max_row = parse_range(range_)
+            for row in sheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=min_col, values_only=True):
+                yield row[0]
+    finally:
+        workbook.close()
+
+def iter_sheet_records(filepath: str, ranges: str, sheet_name=None, delimeter:str=";") -> Iterator[List[str]]:
+    '''Lazily reads values of cells in given range of a spreadsheet, using a reader for its format.'''
+    return iter_records(iter_sheet_values(filepath, ranges, sheet_name), delimeter)
+
+def iter_sheet_values(filepath: str, ranges: str, sheet_name=None) -> Iterator[Any]:
+    '''Lazily reads values of cells (empty ones too) in given range of a spreadsheet, using a reader for its format.'''
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        yield from iter_xlsx_values(filepath, ranges, sheet_name)
+    elif extension == ".csv":
+        yield from iter_csv_values(filepath, ranges)
+    elif extension == ".xls":
+        yield from iter_xls_values(filepath, ranges, sheet_name)
+    else:
+        # Untested format, converting it to .xlsx through pyexcel
+        create_xlsx_copy(filepath)
+        xlsx_filepath = filepath.split(".")[0] + ".xlsx"
+        try:
+            yield from iter_xlsx_values(xlsx_filepath, ranges, sheet_name)
+        finally:
+            os.remove(xlsx_filepath)
+
+def load_xls_sheet_values(xls_filepath: str, ranges: str, sheet_name=None, delimeter:str=";") -> List[List[str]]:
+    '''Reads given XLS(X) or CSV specific sheet and returns values of cells in given range.'''
+    return list(iter_sheet_records(xls_filepath, ranges, sheet_name, delimeter))
+
+def get_active_sheetname(xls_filepath: str) -> str:
+    extension = os.path.splitext(xls_filepath)[1].lower()
+    if extension == ".csv":
+        # CSV files have a single sheet, named after the file
+        return os.path.basename(xls_filepath)
+    elif extension == ".xls":
+        import xlrd
+        workbook = xlrd.open_workbook(xls_filepath, on_demand=True)
+        sheetname = workbook.sheet_names()[0]
+        workbook.release_resources()
+        return sheetname
+
+    import openpyxl
     is_temp = False
-    if xls_filepath.split(".")[1] != "xlsx":
+    if extension not in (".xlsx", ".xlsm"):
         is_temp = True
         create_xlsx_copy(xls_filepath)
         xls_filepath = xls_filepath.split(".")[0] + ".xlsx"
@@ -132,4 +258,109 @@ def read_savedrecs(filename: str) -> List[List[str]]:
     for line in lines:
         elements = line.split("\t")
         matrix.append(elements)
-    return matrix
\ No newline at end of file
+    return matrix
+
+def iter_savedrecs_records(filename: str, ranges: str, delimeter:str=";") -> Iterator[List[str]]:
+    '''Lazily reads tab-delimeted file (WOS savedrecs.txt), one record per cell in given range.
+    Besides Excel-style ranges ("E1:E18"), a part of ranges can be a field tag from
+    the header line, for example "DE|ID" reads author and Keywords Plus of every record.'''
+    return iter_records(iter_savedrecs_values(filename, ranges), delimeter)
+
+def iter_savedrecs_values(filename: str, ranges: str) -> Iterator[Any]:
+    '''Lazily reads values of cells (empty ones too) in given range or field tags of a tab-delimeted file.'''
+    def rows():
+        for line in iter_savedrecs_lines(filename):
+            yield line.split("\t")
+
+    yield from iter_range_rows(rows, resolve_savedrecs_ranges(filename, ranges))
+
+def iter_savedrecs_lines(filename: str, start:int=0, end:int=None) -> Iterator[str]:
+    '''Lazily reads lines of a tab-delimeted file (utf-8, lines end with \\n or \\r\\n),
+    only the lines from byte start up to byte end if given (see split_savedrecs).'''
+    with open(filename, "rb") as f:
+        f.seek(start)
+        if end == None:
+            lines = iter(f)
+        else:
+            # Same lines as iterating over the file: split after every newline byte
+            lines = f.read(end - start).split(b"\n")
+            if lines[-1] == b"":
+                lines.pop()
+        for number, line in enumerate(lines):
+            if number == 0 and start == 0 and line.startswith(codecs.BOM_UTF8):
+                line = line[len(codecs.BOM_UTF8):]
+            yield line.decode("utf-8").rstrip("\r\n")
+
+def resolve_savedrecs_ranges(filename: str, ranges: str) -> str:
+    '''Replaces field tags of the header line in ranges ("DE|ID") with ranges of their whole columns.'''
+    header = next(iter_savedrecs_lines(filename), "").split("\t")
+    resolved = list()
+    for range_ in ranges.split("|"):
+        tag = range_.strip().upper()
+        if tag in header:
+            # Whole column of the field, skipping the header line
+            column = header.index(tag) + 1
+            resolved.append(f"{get_column_letter(column)}2:{get_column_letter(column)}")
+        else:
+            resolved.append(range_)
+    return "|".join(resolved)
+
+def split_savedrecs(filename: str, block_size: int) -> List[Tuple[int, int, int]]:
+    '''Splits tab-delimeted file into blocks of about block_size bytes ending at line ends,
+    returns (start byte, end byte, number of the first row) of every block, so that blocks can be read separately.'''
+    blocks = list()
+    start = 0
+    row = 1
+    with open(filename, "rb") as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            data += f.readline()
+            blocks.append((start, start + len(data), row))
+            start += len(data)
+            row += data.count(b"\n")
+    return blocks
+
+def iter_savedrecs_block_values(filename: str, ranges: str, start: int, end: int, first_row: int) -> Iterator[Any]:
+    '''Lazily reads values of cells (empty ones too) in given range of one block of a tab-delimeted file.
+    ranges must already be resolved (see resolve_savedrecs_ranges).'''
+    def rows():
+        for line in iter_savedrecs_lines(filename, start, end):
+            yield line.split("\t")
+
+    yield from iter_range_rows(rows, ranges, first_row)
+
+def iter_file_records(filepath: str, ranges: str, sheet_name=None, delimeter:str=";") -> Iterator[List[str]]:
+    '''Lazily reads records from a spreadsheet or tab-delimeted file (WOS savedrecs.txt).'''
+    if filepath.endswith(".txt"):
+        return iter_savedrecs_records(filepath, ranges, delimeter)
+    return iter_sheet_records(filepath, ranges, sheet_name, delimeter)
+
+def iter_file_values(filepath: str, ranges: str, sheet_name=None) -> Iterator[Any]:
+    '''Lazily reads values of cells (empty ones too) from a spreadsheet or tab-delimeted file (WOS savedrecs.txt).'''
+    if filepath.endswith(".txt"):
+        return iter_savedrecs_values(filepath, ranges)
+    return iter_sheet_values(filepath, ranges, sheet_name)
+
+def iter_file_records_with_values(filepath: str, ranges: str, value_ranges: str, sheet_name=None,
+                                  delimeter:str=";") -> Iterator[Tuple[List[str], Any]]:
+    '''Lazily reads records together with the value of another column in the same rows
+    (for example publication year), as (record, value) pairs.
+    value_ranges must select as many cells as ranges, a single range is used for every part of ranges.'''
+    parts = ranges.split("|")
+    value_parts = value_ranges.split("|")
+    if len(value_parts) == 1:
+        value_parts = value_parts * len(parts)
+    if len(value_parts) != len(parts):
+        raise ValueError(f"Range {repr(value_ranges)} must have one part or as many parts as {repr(ranges)}.")
+
+    missing = object()
+    cells = iter_file_values(filepath, ranges, sheet_name)
+    values = iter_file_values(filepath, "|".join(value_parts), sheet_name)
+    for cell, value in zip_longest(cells, values, fillvalue=missing):
+        if cell is missing or value is missing:
+            raise ValueError(f"Ranges {repr(ranges)} and {repr(value_ranges)} of {filepath} have different number of cells.")
+        record = split_cell(cell, delimeter)
+        if record != None:
+            yield record, value
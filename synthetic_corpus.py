@@ -0,0 +1,113 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import os
+import csv
+import random
+import argparse
+from itertools import accumulate
+from typing import List, Dict, Tuple
+
+# Formats the corpus can be written in, same as the inputs of the program
+CORPUS_FORMATS = ("xlsx", "csv", "savedrecs")
+
+# Column of the keywords in the generated files and its range in the spreadsheets
+KEYWORDS_COLUMN = "A"
+
+FIRST_YEAR = 1990
+
+_WORDS = ("analysis", "model", "network", "learning", "climate", "health", "energy", "policy", "system", "data",
+          "education", "water", "risk", "management", "design", "quality", "market", "protein", "cell", "soil")
+
+def make_keyword(rank: int) -> str:
+    '''Returns a readable unique keyword for a rank, e.g. "network learning 12".'''
+    first = _WORDS[rank % len(_WORDS)]
+    second = _WORDS[(rank // len(_WORDS)) % len(_WORDS)]
+    return f"{first} {second} {rank}"
+
+def zipf_cum_weights(vocabulary_size: int, exponent:float=1.0) -> List[float]:
+    '''Cumulative weights of ranks 1..vocabulary_size, frequency of rank r is proportional to 1 / r^exponent.'''
+    return list(accumulate(1 / rank ** exponent for rank in range(1, vocabulary_size + 1)))
+
+def generate_records(num_records: int, keywords_per_record:int=5, vocabulary_size:int=10000, exponent:float=1.0,
+                     case_variants:float=0.1, seed:int=0) -> List[Tuple[List[str], int]]:
+    '''Generates records of a bibliographic corpus, as (keywords, publication year).
+
+    Keywords follow Zipf's law, number of keywords of a record is uniform in
+    1..2*keywords_per_record-1 (keywords_per_record on average). A part of the
+    keywords (case_variants) is capitalized, like author keywords of real exports.'''
+    rng = random.Random(seed)
+    cum_weights = zipf_cum_weights(vocabulary_size, exponent)
+    ranks = range(vocabulary_size)
+    keywords = [make_keyword(rank) for rank in ranks]
+    records = list()
+    for number in range(num_records):
+        size = rng.randint(1, 2 * keywords_per_record - 1)
+        record = list()
+        for rank in rng.choices(ranks, cum_weights=cum_weights, k=size):
+            keyword = keywords[rank]
+            if rng.random() < case_variants:
+                keyword = keyword.capitalize()
+            record.append(keyword)
+        records.append((record, FIRST_YEAR + number * 30 // max(num_records, 1)))
+    return records
+
+def write_xlsx(records: List[Tuple[List[str], int]], filename: str, delimeter:str=";") -> None:
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(filename, {"constant_memory": True})
+    worksheet = workbook.add_worksheet()
+    worksheet.write_row(0, 0, ["DE", "PY"])
+    for row, (keywords, year) in enumerate(records, start=1):
+        worksheet.write_row(row, 0, [f"{delimeter} ".join(keywords), year])
+    workbook.close()
+
+def write_csv(records: List[Tuple[List[str], int]], filename: str, delimeter:str=";") -> None:
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["DE", "PY"])
+        writer.writerows([f"{delimeter} ".join(keywords), year] for keywords, year in records)
+
+def write_savedrecs(records: List[Tuple[List[str], int]], filename: str, delimeter:str=";") -> None:
+    '''Writes tab-delimeted file in the layout of WOS savedrecs.txt exports.'''
+    with open(filename, "w", encoding="utf-8-sig") as f:
+        f.write("PT\tAU\tTI\tDE\tPY\n")
+        for number, (keywords, year) in enumerate(records):
+            f.write(f"J\tAuthor, {number}\tTitle {number}\t{f'{delimeter} '.join(keywords)}\t{year}\n")
+
+_WRITERS = {"xlsx": write_xlsx, "csv": write_csv, "savedrecs": write_savedrecs}
+
+def corpus_filename(folder: str, name: str, corpus_format: str) -> str:
+    return os.path.join(folder, f"{name}.txt" if corpus_format == "savedrecs" else f"{name}.{corpus_format}")
+
+def corpus_range(corpus_format: str, num_records: int) -> str:
+    '''Returns range argument selecting keywords of a generated file.'''
+    if corpus_format == "savedrecs":
+        return "DE"
+    return f"{KEYWORDS_COLUMN}2:{KEYWORDS_COLUMN}{num_records + 1}"
+
+def generate_corpus(folder: str, name: str, num_records: int, formats=CORPUS_FORMATS, **kwargs) -> Dict[str, str]:
+    '''Generates a corpus (see generate_records for kwargs) and writes it in every format,
+    returns paths of the written files keyed by format.'''
+    os.makedirs(folder, exist_ok=True)
+    records = generate_records(num_records, **kwargs)
+    paths = dict()
+    for corpus_format in formats:
+        paths[corpus_format] = corpus_filename(folder, name, corpus_format)
+        _WRITERS[corpus_format](records, paths[corpus_format])
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates synthetic WoS/Scopus-like corpus with Zipf-distributed keywords.")
+    parser.add_argument("folder", help="Folder for the generated files.")
+    parser.add_argument("--name", default="corpus")
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--keywords_per_record", type=int, default=5)
+    parser.add_argument("--vocabulary_size", type=int, default=10000)
+    parser.add_argument("--exponent", type=float, default=1.0, help="Exponent of Zipf's law.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formats", nargs="+", choices=CORPUS_FORMATS, default=list(CORPUS_FORMATS))
+    args = parser.parse_args()
+
+    for path in generate_corpus(args.folder, args.name, args.records, args.formats,
+                                keywords_per_record=args.keywords_per_record, vocabulary_size=args.vocabulary_size,
+                                exponent=args.exponent, seed=args.seed).values():
+        print(path)
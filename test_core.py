@@ -0,0 +1,39 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+'''Checks that the co-occurrence engines give the same matrices as the dense reference one.'''
+
+import importlib.util
+
+import pytest
+
+from core import generate_co_occurrence_matrix
+
+ENGINES = ["sparse", "dense"]
+if importlib.util.find_spec("numpy") != None and importlib.util.find_spec("scipy") != None:
+    ENGINES.append("incidence")
+
+# Keywords repeated inside a record, keywords that occur alone and records of a single keyword
+GRAPH = [
+    ["a", "b", "c", "a"],
+    ["b", "c", "b", "b"],
+    ["d"],
+    ["c", "e", "a", "e", "c"],
+    ["f", "g"],
+    ["a", "a"],
+]
+
+@pytest.mark.parametrize("binary", [False, True])
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_match(engine, binary, records):
+    graph = [keywords for keywords, year in records]
+    for graph in (GRAPH, graph):
+        assert generate_co_occurrence_matrix(graph, binary, engine) == generate_co_occurrence_matrix(graph, binary, "dense")
+
+def test_dense_counts():
+    matrix = generate_co_occurrence_matrix(GRAPH, engine="dense")
+    keywords = matrix[0][1:]
+    rows = {row[0]: dict(zip(keywords, row[1:])) for row in matrix[1:]}
+    # A pair is counted once per record, however many times its keywords repeat
+    assert rows["a"]["c"] == 2
+    assert rows["b"]["c"] == 2
+    assert rows["a"]["a"] == 0
+    assert rows["d"] == dict.fromkeys(keywords, 0)
@@ -0,0 +1,71 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import pytest
+
+import pipeline
+from corpus import Corpus, build_corpus, write_corpus, source_fingerprint
+from synthetic_corpus import write_savedrecs
+from vocabulary import encode_graph
+
+RECORDS = [["Health", "Soil"], [], ["Soil", "Water", "Health"], ["Energy"]]
+
+def test_build_corpus(tmp_path):
+    vocabulary, graph = encode_graph(RECORDS)
+    with build_corpus(str(tmp_path / "corpus.artykc"), iter(RECORDS), {"source": "test"}) as corpus:
+        assert list(corpus) == graph
+        assert len(corpus) == len(RECORDS)
+        assert corpus[2] == graph[2]
+        assert corpus.metadata == {"source": "test"}
+        assert corpus.vocabulary().most_common() == vocabulary.most_common()
+        assert corpus.vocabulary().decode_graph(corpus) == RECORDS
+
+def test_write_corpus(tmp_path):
+    vocabulary, graph = encode_graph(RECORDS)
+    with write_corpus(str(tmp_path / "corpus.artykc"), graph, vocabulary) as corpus:
+        assert list(corpus) == graph
+    # Reopened from the file
+    with Corpus.open(str(tmp_path / "corpus.artykc")) as corpus:
+        assert list(corpus) == graph
+        assert list(corpus.counts) == vocabulary.counts
+
+def test_not_a_corpus(tmp_path):
+    path = tmp_path / "corpus.artykc"
+    path.write_bytes(b"not a corpus file at all")
+    with pytest.raises(ValueError):
+        Corpus.open(str(path))
+
+def test_source_fingerprint(tmp_path):
+    path = tmp_path / "records.txt"
+    path.write_text("a", encoding="utf-8")
+    fingerprint = source_fingerprint([str(path)], "DE", None, ";")
+    assert source_fingerprint([str(path)], "DE", None, ";") == fingerprint
+    assert source_fingerprint([str(path)], "ID", None, ";") != fingerprint
+    path.write_text("ab", encoding="utf-8")
+    assert source_fingerprint([str(path)], "DE", None, ";") != fingerprint
+
+def test_corpus_runs(tmp_path, monkeypatch, records, run_analysis):
+    filepath = str(tmp_path / "savedrecs.txt")
+    write_savedrecs(records, filepath)
+    corpus = str(tmp_path / "corpus.artykc")
+    settings = dict(homogenize=True, filter=20, frequency=True)
+    plain = run_analysis([filepath], "DE", str(tmp_path / "plain" / "out.csv"), **settings)
+    assert plain
+    assert run_analysis([filepath], "DE", str(tmp_path / "built" / "out.csv"), corpus=corpus, **settings) == plain
+
+    builds = list()
+
+    def counted_build_corpus(*args, **kwargs):
+        builds.append(args[0])
+        return build_corpus(*args, **kwargs)
+
+    monkeypatch.setattr(pipeline, "build_corpus", counted_build_corpus)
+    # Reused while the input doesn't change
+    assert run_analysis([filepath], "DE", str(tmp_path / "reused" / "out.csv"), corpus=corpus, **settings) == plain
+    assert builds == []
+
+    # Rebuilt once it changes
+    write_savedrecs(records[:100], filepath)
+    changed = run_analysis([filepath], "DE", str(tmp_path / "changed" / "out.csv"), corpus=corpus, **settings)
+    assert builds == [corpus]
+    assert changed != plain
+    assert changed == run_analysis([filepath], "DE", str(tmp_path / "plain_changed" / "out.csv"), **settings)
@@ -0,0 +1,64 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+from collections import Counter
+
+import pytest
+
+from heavy_hitters import SpaceSaving, approximate_top
+from synthetic_corpus import generate_records
+
+@pytest.fixture(scope="module")
+def stream():
+    '''Keywords of a Zipf-distributed corpus with a large vocabulary, in order of the records.'''
+    records = generate_records(3000, keywords_per_record=5, vocabulary_size=5000, seed=2)
+    return [keyword for keywords, year in records for keyword in keywords]
+
+def test_exact_when_everything_fits():
+    summary = SpaceSaving(10)
+    summary.update("abracadabra")
+    assert summary.most_common() == Counter("abracadabra").most_common()
+    assert summary.guaranteed(3)
+    with pytest.raises(ValueError):
+        SpaceSaving(0)
+
+@pytest.mark.parametrize("capacity", [20, 100, 500])
+def test_error_bounds(stream, capacity):
+    summary = SpaceSaving(capacity)
+    summary.update(stream)
+    counts = Counter(stream)
+    assert len(summary) == capacity
+    assert summary.total == len(stream)
+    for item, count in summary.counts.items():
+        # Estimated counts overestimate by at most the recorded error, which is at most total / capacity
+        assert count - summary.errors[item] <= counts[item] <= count
+        assert summary.errors[item] <= len(stream) / capacity
+    # Every item occurring more than total / capacity times is kept
+    assert all(item in summary.counts for item, count in counts.items() if count > len(stream) / capacity)
+
+@pytest.mark.parametrize("n", [5, 20, 50])
+def test_guaranteed_top(stream, n):
+    counts = Counter(stream)
+    exact = [count for item, count in counts.most_common(n)]
+    for capacity in (n, 2 * n, 10 * n, 50 * n):
+        summary = SpaceSaving(capacity)
+        summary.update(stream)
+        if summary.guaranteed(n):
+            # Items tied with the n-th one can be swapped, so true counts are compared
+            assert sorted((counts[item] for item, count in summary.most_common(n)), reverse=True) == exact
+    # The default number of candidates is enough for this corpus
+    assert summary.guaranteed(n)
+
+def test_approximate_top_recall(stream):
+    counts = Counter(stream)
+    records = [stream[i:i + 5] for i in range(0, len(stream), 5)]
+    for n in (10, 50):
+        top = approximate_top(records, n)
+        assert len(top) == n
+        recall = len({item for item, count in top} & {item for item, count in counts.most_common(n)}) / n
+        assert recall >= 0.9
+
+def test_approximate_filter_matches_exact(tmp_path, corpus, run_analysis):
+    exact = run_analysis([corpus["savedrecs"]], "DE", str(tmp_path / "exact" / "out.csv"), filter=20, frequency=True)
+    approximate = run_analysis([corpus["savedrecs"]], "DE", str(tmp_path / "approximate" / "out.csv"),
+                               filter=20, approximate_filter=True, filter_candidates=40)
+    assert approximate["out.csv"] == exact["out.csv"]
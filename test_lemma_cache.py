@@ -0,0 +1,83 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import itertools
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import core
+import lemma_cache
+from core import lemmatize_texts
+from download_lemmatizers import models
+from lemma_cache import LemmaCache
+
+class FakeNlp:
+    '''Lemmatizes by dropping a trailing "s", remembering every text it was given.'''
+    def __init__(self) -> None:
+        self.texts = list()
+
+    def pipe(self, texts, batch_size:int=1000, n_process:int=1):
+        for text in texts:
+            self.texts.append(text)
+            yield [SimpleNamespace(lemma_=word[:-1] if word.endswith("s") else word) for word in text.split()]
+
+@pytest.fixture
+def nlp(tmp_path, monkeypatch):
+    '''Fake english model with version "1.0" in tmp_path/models, see set_model_version.'''
+    nlp = FakeNlp()
+    os.makedirs(tmp_path / "models" / models["english"])
+    set_model_version(tmp_path, "1.0")
+    monkeypatch.setattr(core, "resource_path", lambda relative_path: str(tmp_path / relative_path))
+    monkeypatch.setattr(core, "load_nlp", lambda model: nlp)
+    return nlp
+
+def set_model_version(tmp_path, version: str) -> None:
+    with open(tmp_path / "models" / models["english"] / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"version": version}, f)
+
+def test_get_and_set(tmp_path):
+    with LemmaCache(str(tmp_path / "cache.sqlite3")) as cache:
+        assert cache.get_many("model", "1.0", ["cats"]) == dict()
+        cache.set_many("model", "1.0", {"cats": "cat", "dogs": "dog"})
+        assert cache.get_many("model", "1.0", ["cats", "dogs", "birds"]) == {"cats": "cat", "dogs": "dog"}
+        # Other models and versions don't share lemmas
+        assert cache.get_many("model", "2.0", ["cats"]) == dict()
+        assert cache.get_many("other", "1.0", ["cats"]) == dict()
+        assert (cache.hits, cache.misses) == (2, 4)
+    # Lemmas persist across runs
+    with LemmaCache(str(tmp_path / "cache.sqlite3")) as cache:
+        assert cache.get_many("model", "1.0", ["cats"]) == {"cats": "cat"}
+        cache.clear()
+        assert len(cache) == 0
+
+def test_eviction(tmp_path, monkeypatch):
+    # Every call gets a later time, so that the least recently used entry is known
+    monkeypatch.setattr(lemma_cache.time, "time", itertools.count().__next__)
+    with LemmaCache(str(tmp_path / "cache.sqlite3"), max_size=2) as cache:
+        cache.set_many("model", "1.0", {"a": "a"})
+        cache.set_many("model", "1.0", {"b": "b"})
+        cache.set_many("model", "1.0", {"c": "c"})
+        assert len(cache) == 2
+        assert cache.get_many("model", "1.0", ["a", "b", "c"]) == {"b": "b", "c": "c"}
+
+def test_lemmatize_hits_and_misses(tmp_path, nlp):
+    with LemmaCache(str(tmp_path / "cache.sqlite3")) as cache:
+        assert lemmatize_texts(["cats", "dogs", "cats"], cache=cache) == {"cats": "cat", "dogs": "dog"}
+        assert nlp.texts == ["cats", "dogs"]
+        assert (cache.hits, cache.misses) == (0, 2)
+
+        # Only strings missing from the cache are lemmatized
+        assert lemmatize_texts(["dogs", "birds"], cache=cache) == {"dogs": "dog", "birds": "bird"}
+        assert nlp.texts == ["cats", "dogs", "birds"]
+        assert (cache.hits, cache.misses) == (1, 3)
+
+def test_model_version_invalidates(tmp_path, nlp):
+    with LemmaCache(str(tmp_path / "cache.sqlite3")) as cache:
+        lemmatize_texts(["cats"], cache=cache)
+        set_model_version(tmp_path, "2.0")
+        assert lemmatize_texts(["cats"], cache=cache) == {"cats": "cat"}
+        # Lemmas of the old version are never returned for the updated model
+        assert nlp.texts == ["cats", "cats"]
+        assert (cache.hits, cache.misses) == (0, 2)
@@ -0,0 +1,62 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+from itertools import combinations
+
+import pytest
+
+from network_analysis import NetworkAnalysis, NETWORK_ANALYSIS_HEADER, build_adjacency, louvain, modularity, top_neighbours
+
+# Two cliques of four keywords joined by a single weak link, and a keyword without links
+KEYWORDS = ["a", "b", "c", "d", "e", "f", "g", "h", "alone"]
+PAIRS = {**{pair: 3 for pair in combinations(range(4), 2)}, **{pair: 2 for pair in combinations(range(4, 8), 2)}, (3, 4): 1, (0, 8): 0}
+
+def test_build_adjacency():
+    adjacency = build_adjacency(len(KEYWORDS), PAIRS)
+    assert adjacency[3] == {0: 3, 1: 3, 2: 3, 4: 1}
+    assert adjacency[4][3] == 1
+    # Pairs with zero weight aren't links
+    assert adjacency[8] == dict()
+    assert build_adjacency(len(KEYWORDS), PAIRS, binary=True)[3] == {0: 1, 1: 1, 2: 1, 4: 1}
+
+def test_top_neighbours():
+    adjacency = build_adjacency(len(KEYWORDS), PAIRS)
+    neighbours = top_neighbours(adjacency, 2)
+    # Ties are broken by lower index
+    assert neighbours[3] == [(0, 3), (1, 3)]
+    assert neighbours[4] == [(5, 2), (6, 2)]
+    assert neighbours[8] == []
+
+def test_louvain_finds_cliques():
+    adjacency = build_adjacency(len(KEYWORDS), PAIRS)
+    clusters = louvain(adjacency)
+    # The cliques are the same size and numbered in order of their keywords, the keyword without links is alone
+    assert clusters == [1, 1, 1, 1, 2, 2, 2, 2, 3]
+    # Clusters are numbered by size
+    assert louvain(build_adjacency(3, {(0, 1): 1})) == [1, 1, 2]
+
+def test_modularity():
+    adjacency = build_adjacency(8, {pair: 1 for pair in PAIRS if 8 not in pair})
+    # 13 links, 6 inside each clique, each clique has total link strength 13
+    assert modularity(adjacency, [1] * 4 + [2] * 4) == pytest.approx(2 * (6 / 13 - (13 / 26) ** 2))
+    assert modularity(adjacency, [1] * 8) == pytest.approx(0)
+    assert modularity(build_adjacency(2, dict()), [1, 2]) == 0
+
+def test_network_analysis():
+    analysis = NetworkAnalysis(KEYWORDS, PAIRS, top_k=2)
+    assert analysis.summary() == {"nodes": 9, "links": 13, "total_link_strength": 31, "clusters": 3,
+                                  "modularity": round(modularity(build_adjacency(9, PAIRS), analysis.clusters), 4)}
+    rows = analysis.rows()
+    assert rows[0] == NETWORK_ANALYSIS_HEADER
+    assert rows[4] == ("d", 4, 10, 1, "a (3); b (3)")
+    assert rows[9] == ("alone", 0, 0, 3, "")
+
+def test_similarity_weights():
+    analysis = NetworkAnalysis(["a", "b", "c"], {(0, 1): 0.5, (1, 2): 0.1234567})
+    assert analysis.rows()[2][2] == pytest.approx(0.623457)
+    assert analysis.rows()[1][4] == "b (0.5)"
+
+def test_pipeline_writes_network_analysis(tmp_path, corpus, run_analysis):
+    outputs = run_analysis([corpus["savedrecs"]], "DE", str(tmp_path / "out.csv"), filter=20, network_analysis=True, top_neighbours=3)
+    rows = outputs["out_network.csv"].splitlines()
+    assert rows[0] == ",".join(NETWORK_ANALYSIS_HEADER)
+    assert len(rows) == 21
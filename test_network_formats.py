@@ -0,0 +1,77 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import pytest
+
+import spreadsheet
+from network_formats import write_network
+
+KEYWORDS = ["Health", "Soil", 'Climate "change"']
+PAIRS = {(0, 1): 3, (0, 2): 1, (1, 2): 0}
+FREQUENCY_ANALYSIS = [("Health", 4), ("Soil", 3), ('Climate "change"', 1)]
+NETWORK_ANALYSIS = [("Keyword", "Degree"), ("Health", 2), ("Soil", 1), ('Climate "change"', 1)]
+
+def read_sheets(filename: str) -> dict:
+    import openpyxl
+    workbook = openpyxl.load_workbook(filename, read_only=True)
+    try:
+        return {worksheet.title: [list(row) for row in worksheet.iter_rows(values_only=True)] for worksheet in workbook.worksheets}
+    finally:
+        workbook.close()
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_xlsx(tmp_path, binary):
+    filename = str(tmp_path / "out.xlsx")
+    write_network(KEYWORDS, PAIRS, filename, binary, FREQUENCY_ANALYSIS, network_analysis=NETWORK_ANALYSIS)
+    sheets = read_sheets(filename)
+    assert list(sheets) == ["Co-occurrence matrix", "Frequency Analysis", "Network Analysis"]
+    weight = 1 if binary else 3
+    assert sheets["Co-occurrence matrix"] == [
+        [None, *KEYWORDS],
+        ["Health", 0, weight, 1],
+        ["Soil", weight, 0, 0],
+        ['Climate "change"', 1, 0, 0],
+    ]
+    assert sheets["Frequency Analysis"] == [list(row) for row in FREQUENCY_ANALYSIS]
+    assert sheets["Network Analysis"] == [list(row) for row in NETWORK_ANALYSIS]
+
+def test_xlsx_without_analysis_sheets(tmp_path):
+    filename = str(tmp_path / "out.xlsx")
+    write_network(KEYWORDS, PAIRS, filename)
+    assert list(read_sheets(filename)) == ["Co-occurrence matrix"]
+
+def test_xlsx_too_many_keywords(tmp_path, monkeypatch):
+    monkeypatch.setattr(spreadsheet, "EXCEL_MAX_COLUMNS", 3)
+    with pytest.raises(ValueError):
+        write_network(KEYWORDS, PAIRS, str(tmp_path / "out.xlsx"))
+
+def test_edge_list(tmp_path):
+    filename = tmp_path / "out.csv"
+    write_network(KEYWORDS, PAIRS, str(filename), frequency_analysis=FREQUENCY_ANALYSIS, network_analysis=NETWORK_ANALYSIS)
+    assert filename.read_text(encoding="utf-8").splitlines() == [
+        "Source,Target,Weight", "Health,Soil,3", 'Health,"Climate ""change""",1']
+    assert (tmp_path / "out_frequency.csv").read_text(encoding="utf-8").splitlines() == [
+        "Keyword,Frequency", "Health,4", "Soil,3", '"Climate ""change""",1']
+    assert (tmp_path / "out_network.csv").read_text(encoding="utf-8").splitlines()[:2] == ["Keyword,Degree", "Health,2"]
+
+def test_graphml(tmp_path):
+    from xml.etree import ElementTree
+    filename = str(tmp_path / "out.graphml")
+    write_network(KEYWORDS, PAIRS, filename, frequency_analysis=FREQUENCY_ANALYSIS)
+    namespace = {"g": "http://graphml.graphdrawing.org/xmlns"}
+    graph = ElementTree.parse(filename).getroot().find("g:graph", namespace)
+    labels = [node.find("g:data[@key='label']", namespace).text for node in graph.findall("g:node", namespace)]
+    frequencies = [int(node.find("g:data[@key='frequency']", namespace).text) for node in graph.findall("g:node", namespace)]
+    edges = [(edge.get("source"), edge.get("target"), edge.find("g:data", namespace).text) for edge in graph.findall("g:edge", namespace)]
+    assert labels == KEYWORDS
+    assert frequencies == [4, 3, 1]
+    assert edges == [("n0", "n1", "3"), ("n0", "n2", "1")]
+
+def test_pajek(tmp_path):
+    filename = tmp_path / "out.net"
+    write_network(KEYWORDS, PAIRS, str(filename), binary=True)
+    assert filename.read_bytes().decode("utf-8").split("\r\n") == [
+        "*Vertices 3", '1 "Health"', '2 "Soil"', "3 \"Climate 'change'\"", "*Edges", "1 2 1", "1 3 1", ""]
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_network(KEYWORDS, PAIRS, str(tmp_path / "out.csv"), output_format="gexf")
@@ -0,0 +1,70 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import pytest
+
+from normalization import Normalizer, read_thesaurus, thesaurus_digest
+from vocabulary import encode_graph
+
+GRAPH = [
+    [" Climate change", "climate-change", "Health"],
+    ["Soil", "Soil ", "SOIL"],
+    ["Water", "Excluded"],
+    ["Removed", "Removed"],
+    ["Health", "Climate Change"],
+]
+
+def normalize(normalizer: Normalizer, graph, kept=None):
+    vocabulary, id_graph = encode_graph(graph)
+    vocabulary, id_graph = normalizer.normalize_ids(id_graph, vocabulary, kept)
+    return vocabulary, vocabulary.decode_graph(id_graph)
+
+def write_thesaurus(path: str) -> None:
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write("label\treplace by\n")
+        f.write("Climate-change\tclimate change\n")
+        f.write("removed\t\n")
+        f.write("\n")
+
+def test_read_thesaurus(tmp_path):
+    path = str(tmp_path / "thesaurus.txt")
+    write_thesaurus(path)
+    assert read_thesaurus(path) == {"Climate-change": "climate change", "removed": ""}
+    assert read_thesaurus(path, homogenize=True) == {"climate-change": "climate change", "removed": ""}
+
+def test_thesaurus_digest():
+    assert thesaurus_digest(None) == None
+    assert thesaurus_digest({"a": "b", "c": ""}) == thesaurus_digest({"c": "", "a": "b"})
+    assert thesaurus_digest({"a": "b"}) != thesaurus_digest({"a": "c"})
+
+def test_strip_and_deduplicate():
+    vocabulary, graph = normalize(Normalizer(), GRAPH)
+    assert graph == [
+        ["Climate change", "climate-change", "Health"],
+        ["Soil", "SOIL"],
+        ["Water", "Excluded"],
+        ["Removed"],
+        ["Health", "Climate Change"],
+    ]
+    # Vocabulary is counted on the normalized graph
+    assert dict(vocabulary.most_common())["Health"] == 2
+
+def test_homogenize_thesaurus_and_exclusion(tmp_path):
+    path = str(tmp_path / "thesaurus.txt")
+    write_thesaurus(path)
+    normalizer = Normalizer(True, read_thesaurus(path, homogenize=True), exclude_keywords=["excluded"])
+    kept = list()
+    vocabulary, graph = normalize(normalizer, GRAPH, kept)
+    # Records with an excluded keyword are removed, keywords replaced by nothing are dropped
+    # and records left empty are removed
+    assert graph == [["climate change", "health"], ["soil"], ["health", "climate change"]]
+    assert kept == [0, 1, 4]
+    assert vocabulary.most_common() == [("climate change", 2), ("health", 2), ("soil", 1)]
+
+def test_memo():
+    normalizer = Normalizer(True)
+    normalize(normalizer, GRAPH)
+    unique = len({keyword for line in GRAPH for keyword in line})
+    assert (normalizer.hits, normalizer.misses) == (0, unique)
+    # The memo is kept between graphs
+    normalize(normalizer, GRAPH)
+    assert (normalizer.hits, normalizer.misses) == (unique, unique)
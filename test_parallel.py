@@ -0,0 +1,88 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import json
+
+import pytest
+
+import parallel
+import pipeline
+from analysis_state import AnalysisState
+from normalization import Normalizer
+from parallel import IngestSettings, load_parallel, count_parallel
+from pipeline import Pipeline, run_batch
+from spreadsheet import iter_file_records
+from synthetic_corpus import corpus_range
+from vocabulary import encode_graph
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Splits savedrecs.txt into several blocks, even though the files are small
+    monkeypatch.setattr(parallel, "MIN_BLOCK_SIZE", 1024)
+
+def inputs_of(corpus, records, inputs):
+    if inputs == "parts":
+        # As many files as workers, one task per file
+        return corpus["parts"], "DE"
+    return [corpus[inputs]], corpus_range(inputs, len(records))
+
+def read_serially(filepaths, ranges):
+    return encode_graph(record for filepath in filepaths for record in iter_file_records(filepath, ranges))
+
+@pytest.mark.parametrize("inputs", ["savedrecs", "csv", "parts"])
+def test_load_parallel(corpus, records, inputs):
+    filepaths, ranges = inputs_of(corpus, records, inputs)
+    vocabulary, graph = load_parallel(filepaths, IngestSettings(ranges), 2, chunk_size=100)
+    expected_vocabulary, expected_graph = read_serially(filepaths, ranges)
+    assert graph == expected_graph
+    assert vocabulary.most_common() == expected_vocabulary.most_common()
+
+@pytest.mark.parametrize("inputs", ["savedrecs", "csv", "parts"])
+def test_count_parallel(corpus, records, inputs):
+    filepaths, ranges = inputs_of(corpus, records, inputs)
+    settings = IngestSettings(ranges, homogenize=True, exclude_keywords=["analysis model 20"])
+    raw_vocabulary, state, counters = count_parallel(filepaths, settings, 2, chunk_size=100)
+
+    expected_raw_vocabulary, graph = read_serially(filepaths, ranges)
+    vocabulary, graph = Normalizer(True, exclude_keywords=["analysis model 20"]).normalize_ids(graph, expected_raw_vocabulary)
+    expected_state = AnalysisState(settings.options)
+    expected_state.add_graph(graph, vocabulary)
+    assert raw_vocabulary.most_common() == expected_raw_vocabulary.most_common()
+    assert state.num_records == expected_state.num_records
+    assert state.co_occurrences(0) == expected_state.co_occurrences(0)
+    # Every worker normalizes its own keywords
+    assert counters["normalization_memo_misses"] >= len(expected_raw_vocabulary)
+
+@pytest.mark.parametrize("settings", [dict(), dict(homogenize=True, filter=20, frequency=True)])
+@pytest.mark.parametrize("inputs", ["savedrecs", "csv", "parts"])
+def test_workers_match_one_process(tmp_path, corpus, records, run_analysis, inputs, settings):
+    filepaths, ranges = inputs_of(corpus, records, inputs)
+    one = run_analysis(filepaths, ranges, str(tmp_path / "one" / "out.csv"), **settings)
+    many = run_analysis(filepaths, ranges, str(tmp_path / "many" / "out.csv"), workers=2, **settings)
+    assert one == many
+    assert one
+
+def test_batch_reads_shared_inputs_once(tmp_path, monkeypatch, corpus, run_analysis):
+    loads = list()
+
+    def counted_load_parallel(*args, **kwargs):
+        loads.append(args[0])
+        return load_parallel(*args, **kwargs)
+
+    def no_count_parallel(*args, **kwargs):
+        raise AssertionError("Inputs shared by the jobs must be loaded and kept.")
+
+    monkeypatch.setattr(pipeline, "load_parallel", counted_load_parallel)
+    monkeypatch.setattr(pipeline, "count_parallel", no_count_parallel)
+    job_file = tmp_path / "jobs.json"
+    job_file.write_text(json.dumps({
+        "defaults": {"filepaths": [corpus["savedrecs"]], "range": "DE", "workers": 2, "homogenize": True, "no_run_report": True},
+        "jobs": [{"save_as": "all.csv"}, {"save_as": "top.csv", "filter": 20}, {"save_as": "binary.csv", "binary": True}],
+    }))
+    assert run_batch(str(job_file), Pipeline(lemma_cache_path=str(tmp_path / "lemma_cache.sqlite3"))) == 0
+    assert loads == [[corpus["savedrecs"]]]
+
+    monkeypatch.undo()
+    for job in ("all", "top", "binary"):
+        settings = {"filter": 20} if job == "top" else {"binary": True} if job == "binary" else {}
+        expected = run_analysis([corpus["savedrecs"]], "DE", str(tmp_path / "one" / f"{job}.csv"), homogenize=True, **settings)
+        assert (tmp_path / f"{job}.csv").read_text(encoding="utf-8") == expected[f"{job}.csv"]
@@ -0,0 +1,48 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import pytest
+
+from analysis_state import AnalysisState
+
+SETTINGS = [
+    dict(),
+    dict(filter=20, frequency=True),
+    dict(homogenize=True, filter=15, frequency=True, similarity="association", min_count=2),
+    dict(binary=True, top_k=3, exclude_keywords=["analysis model 20"]),
+]
+
+@pytest.mark.parametrize("settings", SETTINGS)
+def test_save_state_matches_plain_run(tmp_path, corpus, run_analysis, settings):
+    plain = run_analysis([corpus["savedrecs"]], "DE", str(tmp_path / "plain" / "out.csv"), **settings)
+    saved = run_analysis([corpus["savedrecs"]], "DE", str(tmp_path / "saved" / "out.csv"),
+                         save_state=str(tmp_path / "state.artyk"), **settings)
+    assert plain == saved
+    assert plain
+
+def test_filtered_run_saves_every_record(tmp_path, corpus, records, run_analysis):
+    run_analysis([corpus["savedrecs"]], "DE", str(tmp_path / "out.csv"), homogenize=True, filter=5,
+                 save_state=str(tmp_path / "state.artyk"))
+    state = AnalysisState.load(str(tmp_path / "state.artyk"))
+    assert state.num_records == len(records)
+    assert len(state.vocabulary) > 5
+
+@pytest.mark.parametrize("settings", [dict(homogenize=True), dict(homogenize=True, filter=20, frequency=True)])
+def test_merged_state_matches_state_of_all_files(tmp_path, corpus, run_analysis, settings):
+    run_analysis([corpus["parts"][0]], "DE", str(tmp_path / "first" / "out.csv"),
+                 save_state=str(tmp_path / "first.artyk"), homogenize=True)
+    merged = run_analysis([corpus["parts"][1]], "DE", str(tmp_path / "merged" / "out.csv"),
+                          load_state=str(tmp_path / "first.artyk"), save_state=str(tmp_path / "merged.artyk"), **settings)
+    run_analysis(corpus["parts"], "DE", str(tmp_path / "all" / "out.csv"), save_state=str(tmp_path / "all.artyk"), homogenize=True)
+    # Filtering a merged snapshot uses its merged counts, same as merging the snapshot of all files with nothing
+    everything = run_analysis([], "DE", str(tmp_path / "everything" / "out.csv"), load_state=str(tmp_path / "all.artyk"), **settings)
+    assert merged == everything
+    assert AnalysisState.load(str(tmp_path / "merged.artyk")).co_occurrences(0) == AnalysisState.load(str(tmp_path / "all.artyk")).co_occurrences(0)
+    if not settings.get("filter"):
+        # Without filtering, the merged counts are the counts of a run over all files
+        assert merged["out.csv"] == run_analysis(corpus["parts"], "DE", str(tmp_path / "plain" / "out.csv"), **settings)["out.csv"]
+
+def test_incompatible_state(tmp_path, corpus, run_analysis):
+    run_analysis([corpus["parts"][0]], "DE", str(tmp_path / "first" / "out.csv"), save_state=str(tmp_path / "first.artyk"))
+    with pytest.raises(ValueError):
+        run_analysis([corpus["parts"][1]], "DE", str(tmp_path / "merged" / "out.csv"),
+                     load_state=str(tmp_path / "first.artyk"), homogenize=True)
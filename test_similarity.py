@@ -0,0 +1,56 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import importlib.util
+from collections import Counter
+
+import pytest
+
+from analysis_state import AnalysisState
+from core import co_occurrences_ids
+from similarity import prune_pairs, normalize_pairs, keep_top_neighbours, prune_and_normalize
+from vocabulary import encode_graph
+
+ENGINES = ["sparse", "dense"]
+if importlib.util.find_spec("numpy") != None and importlib.util.find_spec("scipy") != None:
+    ENGINES.append("incidence")
+
+# Keywords 0, 1, 2 occur in 4, 2 and 1 of 10 records
+PAIRS = Counter({(0, 1): 2, (0, 2): 1, (1, 2): 1})
+FREQUENCIES = [4, 2, 1]
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("min_count", [1, 2, 3, 10])
+def test_min_count_while_counting(engine, min_count, records):
+    vocabulary, graph = encode_graph(keywords for keywords, year in records)
+    keywords, pairs = co_occurrences_ids(graph, vocabulary, engine)
+    pruned_keywords, pruned_pairs = co_occurrences_ids(graph, vocabulary, engine, min_count=min_count)
+    assert pruned_keywords == keywords
+    assert pruned_pairs == prune_pairs(pairs, min_count)
+    assert all(count >= min_count for count in pruned_pairs.values())
+
+    state = AnalysisState(dict())
+    state.add_graph(graph, vocabulary)
+    assert state.co_occurrences(0, min_count)[1] == pruned_pairs
+
+def test_prune_pairs():
+    assert prune_pairs(PAIRS) == PAIRS
+    assert prune_pairs(PAIRS, 2) == {(0, 1): 2}
+
+def test_normalize_pairs():
+    assert normalize_pairs(PAIRS, FREQUENCIES, 10) == PAIRS
+    association = normalize_pairs(PAIRS, FREQUENCIES, 10, "association")
+    assert association[(0, 1)] == pytest.approx(2 * 10 / (4 * 2))
+    assert normalize_pairs(PAIRS, FREQUENCIES, 10, "jaccard")[(0, 1)] == pytest.approx(2 / (4 + 2 - 2))
+    assert normalize_pairs(PAIRS, FREQUENCIES, 10, "cosine")[(0, 2)] == pytest.approx(1 / 2)
+    assert normalize_pairs(PAIRS, FREQUENCIES, 10, "inclusion")[(1, 2)] == pytest.approx(1)
+    with pytest.raises(ValueError):
+        normalize_pairs(PAIRS, FREQUENCIES, 10, "pearson")
+
+def test_keep_top_neighbours():
+    assert keep_top_neighbours(PAIRS, 0) == PAIRS
+    # (1, 2) is neither the strongest link of 1 nor, on a tie, of 2, whose link to 0 is more frequent
+    assert keep_top_neighbours(PAIRS, 1) == {(0, 1): 2, (0, 2): 1}
+
+def test_prune_and_normalize():
+    pairs = prune_and_normalize(PAIRS, FREQUENCIES, 10, min_count=2, measure="jaccard")
+    assert pairs == {(0, 1): pytest.approx(0.5)}
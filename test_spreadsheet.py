@@ -0,0 +1,114 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import pytest
+
+from spreadsheet import (parse_range, iter_file_records, iter_file_records_with_values, get_active_sheetname,
+                         iter_savedrecs_block_values, resolve_savedrecs_ranges, split_savedrecs, iter_records)
+
+ROWS = [
+    ["Keywords", "Year"],
+    ["Climate change; Health", 2001],
+    ["", 2002],
+    ["Health;Soil ; Water", 2003],
+    [None, None],
+    ["Energy", 2005],
+]
+RECORDS = [["Climate change", "Health"], ["Health", "Soil", "Water"], ["Energy"]]
+
+def write_csv(filename: str) -> None:
+    import csv
+    with open(filename, "w", encoding="utf-8-sig", newline="") as f:
+        csv.writer(f).writerows([["" if value == None else value for value in row] for row in ROWS])
+
+def write_xlsx(filename: str) -> None:
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(filename)
+    worksheet = workbook.add_worksheet("Records")
+    for row, data in enumerate(ROWS):
+        worksheet.write_row(row, 0, data)
+    workbook.close()
+
+def write_xls(filename: str) -> None:
+    xlwt = pytest.importorskip("xlwt")
+    workbook = xlwt.Workbook()
+    worksheet = workbook.add_sheet("Records")
+    for row, data in enumerate(ROWS):
+        for col, value in enumerate(data):
+            if value != None:
+                worksheet.write(row, col, value)
+    workbook.save(filename)
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "xls": write_xls}
+
+def test_parse_range():
+    assert parse_range("E1:E18") == (5, 1, 5, 18)
+    assert parse_range("E5") == (5, 5, 5, 5)
+    assert parse_range("E:E") == (5, 1, 5, None)
+    assert parse_range("AA2:AA") == (27, 2, 27, None)
+    assert parse_range("e2:e3") == (5, 2, 5, 3)
+
+def test_parse_absolute_and_row_ranges():
+    # Ranges copied from Excel
+    assert parse_range("$A$2:$A$301") == (1, 2, 1, 301)
+    assert parse_range(" $B2 : B$9 ") == (2, 2, 2, 9)
+    # Rows only, read from the first column
+    assert parse_range("2:301") == (1, 2, 1, 301)
+
+@pytest.mark.parametrize("range_", ["", ":", "A1:B2:C3", "A-1", "1A"])
+def test_invalid_range(range_):
+    with pytest.raises(ValueError):
+        parse_range(range_)
+
+@pytest.mark.parametrize("file_format", list(WRITERS))
+@pytest.mark.parametrize("ranges", ["A2:A6", "$A$2:$A$6", "2:6", "A2:A", "A2:A3|A4:A6"])
+def test_readers(tmp_path, file_format, ranges):
+    filename = str(tmp_path / f"records.{file_format}")
+    WRITERS[file_format](filename)
+    assert list(iter_file_records(filename, ranges)) == RECORDS
+
+@pytest.mark.parametrize("file_format", list(WRITERS))
+def test_records_with_years(tmp_path, file_format):
+    filename = str(tmp_path / f"records.{file_format}")
+    WRITERS[file_format](filename)
+    records = list(iter_file_records_with_values(filename, "A2:A6", "B2:B6"))
+    assert [record for record, year in records] == RECORDS
+    assert [int(year) for record, year in records] == [2001, 2003, 2005]
+
+def test_active_sheet_name(tmp_path):
+    filename = str(tmp_path / "records.xlsx")
+    write_xlsx(filename)
+    assert get_active_sheetname(filename) == "Records"
+    filename = str(tmp_path / "records.xls")
+    write_xls(filename)
+    assert get_active_sheetname(filename) == "Records"
+
+def write_savedrecs(filename: str, newline:str="\n") -> None:
+    lines = ["PT\tAU\tDE\tID\tPY"]
+    for number, (keywords, year) in enumerate(zip(["Climate change; Health", "", "Health; Soil"] * 20, range(2000, 2060))):
+        lines.append(f"J\tAuthor {number}\t{keywords}\tPlus {number}\t{year}")
+    with open(filename, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(newline.join(lines) + newline)
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_savedrecs(tmp_path, newline):
+    filename = str(tmp_path / "savedrecs.txt")
+    write_savedrecs(filename, newline)
+    records = list(iter_file_records(filename, "DE"))
+    assert len(records) == 40
+    assert records[:2] == [["Climate change", "Health"], ["Health", "Soil"]]
+    # Field tags, cell ranges and both at once
+    assert list(iter_file_records(filename, "C2:C")) == records
+    assert list(iter_file_records(filename, "$C$2:$C$61")) == records
+    assert list(iter_file_records(filename, "DE|ID"))[40:] == [[f"Plus {number}"] for number in range(60)]
+
+@pytest.mark.parametrize("block_size", [1, 100, 1000, 1 << 20])
+def test_savedrecs_blocks(tmp_path, block_size):
+    filename = str(tmp_path / "savedrecs.txt")
+    write_savedrecs(filename, "\r\n")
+    ranges = resolve_savedrecs_ranges(filename, "DE|C5:C20")
+    blocks = split_savedrecs(filename, block_size)
+    values = list()
+    for range_ in ranges.split("|"):
+        for start, end, first_row in blocks:
+            values.extend(iter_savedrecs_block_values(filename, range_, start, end, first_row))
+    assert list(iter_records(values)) == list(iter_file_records(filename, "DE|C5:C20"))
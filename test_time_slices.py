@@ -0,0 +1,66 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import datetime
+
+import pytest
+
+from core import co_occurrences_ids
+from time_slices import make_slices, parse_year, slice_filename, TimeSlices
+from vocabulary import Vocabulary
+
+def test_parse_year():
+    assert parse_year(2015) == 2015
+    assert parse_year(2015.0) == 2015
+    assert parse_year("Mar 2015") == 2015
+    assert parse_year(datetime.date(2015, 3, 1)) == 2015
+    assert parse_year("") == None
+    assert parse_year("n/a") == None
+
+def test_schemes():
+    assert make_slices([1992, 1990, None, 1990], "year") == [(1990, 1990), (1992, 1992)]
+    assert make_slices([1990, 2001], "window", 5) == [(1990, 1994), (1995, 1999), (2000, 2004)]
+    assert make_slices([1990, 2019], "sliding", 10, 5) == [(1990, 1999), (1995, 2004), (2000, 2009), (2005, 2014), (2010, 2019)]
+    # Span shorter than a window
+    assert make_slices([1990, 1992], "sliding", 10, 5) == [(1990, 1999)]
+    assert make_slices([None], "window") == []
+
+def test_sliding_covers_last_years():
+    slices = make_slices([1990, 2021], "sliding", 10, 5)
+    assert slices[-1] == (2012, 2021)
+    assert slices[:-1] == [(1990, 1999), (1995, 2004), (2000, 2009), (2005, 2014), (2010, 2019)]
+
+@pytest.mark.parametrize("scheme", ["window", "sliding"])
+@pytest.mark.parametrize("size, step", [(1, 1), (3, 1), (4, 3), (5, 2), (10, 5), (10, 7)])
+def test_every_year_is_covered(scheme, size, step):
+    for last in range(1990, 2025):
+        years = set(range(1990, last + 1))
+        slices = make_slices(years, scheme, size, step)
+        assert all(last_ - first + 1 == size for first, last_ in slices)
+        assert years <= {year for first, last_ in slices for year in range(first, last_ + 1)}
+
+def test_unknown_scheme():
+    with pytest.raises(ValueError):
+        make_slices([1990], "decade")
+    with pytest.raises(ValueError):
+        make_slices([1990], "window", 0)
+
+def test_slice_filename():
+    assert slice_filename("out.xlsx", 2001, 2005) == "out_2001-2005.xlsx"
+    assert slice_filename("out.csv", 2001, 2001) == "out_2001.csv"
+
+def test_slices_match_separate_counts():
+    records = [["a", "b", "c"], ["b", "c"], ["a", "d", "a"], ["c", "d"], ["e"], ["a", "b"]]
+    years = [2001, 2001, 2002, 2003, None, 2003]
+    vocabulary = Vocabulary()
+    graph = [vocabulary.add(record) for record in records]
+    slices = make_slices(years, "sliding", 2, 1)
+    time_slices = TimeSlices(slices)
+    time_slices.add_graph(graph, years)
+
+    for index, (first, last) in enumerate(slices):
+        selected = [line for line, year in zip(graph, years) if year != None and first <= year <= last]
+        keywords, pairs, frequencies = time_slices.co_occurrences(index, vocabulary)
+        assert (keywords, pairs) == co_occurrences_ids(selected, vocabulary)
+        assert time_slices.num_records[index] == len(selected)
+        assert frequencies == [sum(keyword in records[i] for i, year in enumerate(years)
+                                   if year != None and first <= year <= last) for keyword in keywords]
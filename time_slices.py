@@ -0,0 +1,98 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+import os
+import re
+from collections import Counter
+from typing import List, Dict, Tuple, Any, Iterable
+
+from core import record_pairs, remap_pairs
+from vocabulary import Vocabulary
+
+# year - a slice per year, window - consecutive windows of slice_size years,
+# sliding - windows of slice_size years moved by slice_step years
+TIME_SLICE_SCHEMES = ("year", "window", "sliding")
+
+def parse_year(value: Any) -> int:
+    '''Returns year of a cell value (2015, 2015.0, "2015", "Mar 2015"), None when there is no year.'''
+    if value == None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if hasattr(value, "year"):
+        # Dates and datetimes of spreadsheets
+        return value.year
+    match = re.search(r"\d{4}", str(value))
+    return int(match.group()) if match != None else None
+
+def make_slices(years: Iterable[int], scheme:str="year", size:int=5, step:int=1) -> List[Tuple[int, int]]:
+    '''Returns (first year, last year) of every slice covering the given years.'''
+    present = sorted({year for year in years if year != None})
+    if not present:
+        return list()
+    if scheme == "year":
+        return [(year, year) for year in present]
+    if size < 1 or step < 1:
+        raise ValueError("Slice size and step must be at least 1.")
+    first, last = present[0], present[-1]
+    if scheme == "window":
+        return [(start, start + size - 1) for start in range(first, last + 1, size)]
+    if scheme == "sliding":
+        slices = [(start, start + size - 1) for start in range(first, max(last - size + 1, first) + 1, step)]
+        if slices[-1][1] < last:
+            # The step doesn't divide the span, the last window ends at the last year
+            slices.append((last - size + 1, last))
+        return slices
+    raise ValueError(f"Unknown time slicing scheme: {scheme!r}, expected one of {TIME_SLICE_SCHEMES}")
+
+def slice_label(first: int, last: int) -> str:
+    return str(first) if first == last else f"{first}-{last}"
+
+def slice_filename(output_filename: str, first: int, last: int) -> str:
+    '''Returns name of the output of a slice, e.g. output_2001-2005.xlsx for output.xlsx.'''
+    name, extension = os.path.splitext(output_filename)
+    return f"{name}_{slice_label(first, last)}{extension}"
+
+class TimeSlices:
+    '''Sparse co-occurrence counts of every time slice, accumulated in one pass over the records.
+
+    Pairs of a record are generated once and added to every slice containing
+    its year, so N slices cost one pass instead of N runs of the analysis.'''
+    def __init__(self, slices: List[Tuple[int, int]]) -> None:
+        self.slices = slices
+        # Keyword occurrences in order of first appearance, same as Counter in count_pairs
+        self.counts = [Counter() for _ in slices]
+        self.document_counts = [Counter() for _ in slices]
+        self.pairs = [Counter() for _ in slices]
+        self.num_records = [0] * len(slices)
+        self._year_slices: Dict[int, List[int]] = dict()
+
+    def slices_of(self, year: int) -> List[int]:
+        indices = self._year_slices.get(year)
+        if indices == None:
+            indices = [i for i, (first, last) in enumerate(self.slices) if first <= year <= last]
+            self._year_slices[year] = indices
+        return indices
+
+    def add_graph(self, graph: Iterable[List[int]], years: Iterable[int]) -> None:
+        '''Counts records of a graph of IDs into the slices of their years, records without a year are skipped.'''
+        for line, year in zip(graph, years):
+            if year == None:
+                continue
+            indices = self.slices_of(year)
+            if not indices:
+                continue
+            unique, pairs = record_pairs(line)
+            for i in indices:
+                self.counts[i].update(line)
+                self.document_counts[i].update(unique)
+                self.pairs[i].update(pairs)
+                self.num_records[i] += 1
+
+    def co_occurrences(self, index: int, vocabulary: Vocabulary, min_count:int=1) -> Tuple[List[str], Counter, List[int]]:
+        '''Returns keywords of a slice sorted by frequency, counts of pairs co-occurring at least min_count times
+        keyed by indices into that list and number of records of the slice containing each keyword.'''
+        order = [id_ for id_, count in self.counts[index].most_common()]
+        return vocabulary.decode(order), remap_pairs(self.pairs[index], order, min_count), [self.document_counts[index][id_] for id_ in order]
+
+    def most_common(self, index: int, vocabulary: Vocabulary) -> List[Tuple[str, int]]:
+        return [(vocabulary.keywords[id_], count) for id_, count in self.counts[index].most_common()]
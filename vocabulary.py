@@ -0,0 +1,77 @@
+# Copyright (C) 2024 Beksultan Artykbaev - All Rights Reserved
+
+from typing import List, Dict, Tuple, Iterable
+
+class Vocabulary:
+    '''Interns keywords to integer IDs (in order of first appearance) and counts their frequency.
+
+    The pipeline stages work on records of IDs, keywords are decoded
+    back to strings only when writing the output.'''
+    def __init__(self) -> None:
+        self.keywords: List[str] = list()
+        self.ids: Dict[str, int] = dict()
+        self.counts: List[int] = list()
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def intern(self, keyword: str) -> int:
+        '''Returns ID of keyword, adding it to the vocabulary if it's new.'''
+        id_ = self.ids.get(keyword)
+        if id_ == None:
+            id_ = len(self.keywords)
+            self.ids[keyword] = id_
+            self.keywords.append(keyword)
+            self.counts.append(0)
+        return id_
+
+    def add(self, record: Iterable[str]) -> List[int]:
+        '''Interns every keyword of a record, counts them and returns the record as IDs.'''
+        ids = [self.intern(keyword) for keyword in record]
+        for id_ in ids:
+            self.counts[id_] += 1
+        return ids
+
+    def update(self, other: "Vocabulary") -> List[int]:
+        '''Adds keywords and counts of another vocabulary, returns a list mapping its IDs to IDs of this one.'''
+        mapping = [self.intern(keyword) for keyword in other.keywords]
+        for id_, count in enumerate(other.counts):
+            self.counts[mapping[id_]] += count
+        return mapping
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        return [self.keywords[id_] for id_ in ids]
+
+    def decode_graph(self, graph: List[List[int]]) -> List[List[str]]:
+        return [self.decode(line) for line in graph]
+
+    def top_ids(self, num: int=None) -> List[int]:
+        '''Returns IDs sorted by frequency (only num most frequent if given).'''
+        # sorted is stable, so ties keep the order of first appearance, same as Counter.most_common
+        ids = sorted(range(len(self.keywords)), key=self.counts.__getitem__, reverse=True)
+        return ids if num == None else ids[:num]
+
+    def most_common(self, num: int=None) -> List[Tuple[str, int]]:
+        '''Returns (keyword, frequency) pairs sorted by frequency, same as Counter.most_common.'''
+        return [(self.keywords[id_], self.counts[id_]) for id_ in self.top_ids(num)]
+
+    def remap(self, replacements: Dict[int, str]) -> Tuple["Vocabulary", List[int]]:
+        '''Returns new vocabulary where keywords with the given IDs are replaced
+        (keywords that become equal are merged into one ID, their counts are summed)
+        and a list mapping every old ID to its new ID.'''
+        vocabulary = Vocabulary()
+        mapping = list()
+        for id_, keyword in enumerate(self.keywords):
+            new_id = vocabulary.intern(replacements.get(id_, keyword))
+            vocabulary.counts[new_id] += self.counts[id_]
+            mapping.append(new_id)
+        return vocabulary, mapping
+
+def encode_graph(graph: Iterable[List[str]]) -> Tuple[Vocabulary, List[List[int]]]:
+    '''Interns keywords of a graph, returns the vocabulary and the graph as records of IDs.'''
+    vocabulary = Vocabulary()
+    return vocabulary, [vocabulary.add(line) for line in graph]
+
+def remap_graph(graph: List[List[int]], mapping: List[int]) -> List[List[int]]:
+    '''Replaces IDs in graph using mapping returned by Vocabulary.remap.'''
+    return [[mapping[id_] for id_ in line] for line in graph]